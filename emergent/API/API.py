@@ -28,8 +28,7 @@ def serve(core, addr, port):
     @app.route("/load", methods=['POST'])
     def load():
         print('Loading core state from file.')
-        core.load()
-        core.actuate(core.state())
+        core.load(actuate=True)
         return ''
 
     @app.route("/handshake", methods=['GET', 'POST'])
@@ -3,7 +3,6 @@ import json
 from emergent.utilities import recommender, introspection
 import pickle
 import io
-import matplotlib.pyplot as plt
 
 url_prefix = '/hubs'
 
@@ -241,6 +240,7 @@ def get_blueprint(core):
             return pickle.dumps(obj.algorithm)
 
     def send_plot(fig):
+        import matplotlib.pyplot as plt
         buf = io.BytesIO()
         plt.savefig(buf, format='png')
         buf.seek(0)
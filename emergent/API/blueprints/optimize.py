@@ -60,14 +60,30 @@ def get_blueprint(core):
             hub = core.hubs[payload['hub']]
             experiment = getattr(hub, payload['experiment'])
             bounds = range_dict_to_tuple(payload['range'])
-            pipe = Pipeline(payload['state'], bounds, experiment)
+            pipe = Pipeline(payload['state'], bounds, experiment, budget=payload.get('budget'))
             pipe.from_json(payload['blocks'])
             pipe.cycles_per_sample = int(payload['cycles per sample'])
             if not hasattr(hub, 'pipelines'):
                 hub.pipelines = []
             hub.pipelines.append(pipe)
 
-            Thread(target=pipe.run).start()
+            pipe.thread = Thread(target=pipe.run)
+            pipe.thread.start()
+            return json.dumps({'index': len(hub.pipelines)-1})
         return ''
 
+    @blueprint.route('/hubs/<hub>/<int:index>')
+    def results(hub, index):
+        ''' Returns the points and costs acquired so far by a pipeline started
+            with /run, whether it is still running, and why its budget was
+            exhausted, if it was. '''
+        pipe = core.hubs[hub].pipelines[index]
+        points, costs = pipe.history.snapshot()
+        return json.dumps({'running': pipe.thread.is_alive(),
+                           'exhausted': pipe.exhausted,
+                           'budget': None if pipe.budget is None else pipe.budget.to_dict(),
+                           'evaluations': len(costs),
+                           'points': pipe.unnormalize(points).tolist(),
+                           'costs': costs.tolist()})
+
     return blueprint
@@ -1,3 +1,10 @@
-from pint import UnitRegistry
-ureg = UnitRegistry()
-Q_ = ureg.Quantity
+def __getattr__(name):
+    ''' Creates the pint unit registry on first access to emergent.ureg or
+        emergent.Q_, since building it takes a large fraction of startup time. '''
+    global ureg, Q_
+    if name in ['ureg', 'Q_']:
+        from pint import UnitRegistry
+        ureg = UnitRegistry()
+        Q_ = ureg.Quantity
+        return globals()[name]
+    raise AttributeError("module 'emergent' has no attribute '%s'"%name)
@@ -2,5 +2,6 @@ from .parallel import ProcessHandler
 from .node import Node
 from .core import Core
 from .hub import Hub
+from .dispatch import Dispatcher, DispatchError
 from .knob import Knob, Sensor
 from .device import Device
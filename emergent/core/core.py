@@ -1,7 +1,9 @@
 import logging as log
 import importlib
+import threading
+import time
 from emergent.utilities.persistence import __getstate__
-from socketIO_client import SocketIO, LoggingNamespace
+from emergent.core.dispatch import Dispatcher, DispatchError
 
 class Core():
     ''' This class implements a container for multiple Hubs on a PC, as well as methods
@@ -20,13 +22,32 @@ class Core():
             self.path[subpath] = self.path['network'] + '/%s/'%subpath
         self.hubs = {}
         self.tasks = {}
+        self.concurrent = False         # actuate hubs in parallel
+        self.dispatcher = Dispatcher()
+        self.actuation = {}             # per-hub latency and errors of the last concurrent actuation
+        self.startup = {}               # per-hub startup latency, errors and device connection reports
         self.url = 'http://' + self.addr + ':' + str(self.port)
         self.__getstate__ = lambda: __getstate__([])
 
-    def actuate(self, state, send_over_p2p = True):
-        ''' Issues a macroscopic actuation to all connected Hubs. '''
-        for hub in state:
-            self.hubs[hub].actuate(state[hub], send_over_p2p)
+    def actuate(self, state, send_over_p2p = True, concurrent = None, force = False):
+        ''' Issues a macroscopic actuation to all connected Hubs. If concurrent
+            (default self.concurrent), the Hubs and their Devices are actuated
+            in parallel and the call returns once all have finished; the latency
+            and error of each Hub are stored in self.actuation and those of each
+            Device in hub.actuation. Unless force is True, only knobs which
+            differ from the last commanded state are written. '''
+        if concurrent is None:
+            concurrent = self.concurrent
+        if concurrent and len(state) > 1:
+            calls = {hub: (self.hubs[hub].actuate, (state[hub], send_over_p2p, True, force)) for hub in state}
+            try:
+                self.actuation = self.dispatcher.run(calls)
+            except DispatchError as e:
+                self.actuation = e.report
+                raise
+        else:
+            for hub in state:
+                self.hubs[hub].actuate(state[hub], send_over_p2p, concurrent, force)
 
     def add_hub(self, hub):
         ''' If the address and port match self.addr and self.port, add a local
@@ -40,15 +61,39 @@ class Core():
         network_module = importlib.import_module('emergent.networks.'+self.name+'.network')
         network_module.initialize(self)
 
-    def load(self):
-        ''' Loads all attached Hub states from file. '''
+    def load(self, actuate=False):
+        ''' Loads all attached Hub states from file, optionally writing changed
+            knobs to hardware. '''
         for hub in self.hubs.values():
-            hub.load()
-
-    def post_load(self):
-        ''' Execute the post-load routine for all attached Hubs '''
+            hub.load(actuate)
+
+    def post_load(self, wait=True):
+        ''' Executes the post-load routine for all attached Hubs in parallel, so
+            that each Hub comes online as soon as its own Devices are connected.
+            If wait is False, returns the threads running each Hub's routine
+            without waiting for them; otherwise waits and returns a startup
+            report, which is also stored in self.startup. '''
+        def on_load(hub, result):
+            start = time.perf_counter()
+            try:
+                hub._on_load()
+                log.info('Hub %s online after %.3f s.', hub.name, time.perf_counter()-start)
+            except Exception as e:
+                result['error'] = repr(e)
+                log.error('Hub %s failed to come online: %s', hub.name, e)
+            result['latency'] = time.perf_counter() - start
+            result['devices'] = hub.startup
+
+        threads = {}
         for hub in self.hubs.values():
-            hub._on_load()
+            self.startup[hub.name] = {'latency': None, 'error': None, 'devices': {}}
+            threads[hub.name] = threading.Thread(target=on_load, args=(hub, self.startup[hub.name]), daemon=True)
+            threads[hub.name].start()
+        if not wait:
+            return threads
+        for thread in threads.values():
+            thread.join()
+        return self.startup
 
     def save(self):
         ''' Saves the state of all attached Hubs. '''
@@ -86,6 +131,7 @@ class Core():
     def start_flask_socket_server(self):
         ''' Initialize Flask socket '''
         log.info('Starting dashboard client.')
+        from socketIO_client import SocketIO, LoggingNamespace
         self.socketIO = SocketIO(self.addr, self.port+1, LoggingNamespace)
 
     def emit(self, signal, arg=None):
@@ -41,11 +41,14 @@ class Device():
         self.macro_buffer = MacroBuffer(self)
         self.hub = hub
         self.state = {}
+        self.tolerance = {}     # knob: smallest change worth writing to hardware
+        self.stale = set()      # knobs whose hardware value may differ from Hub.state
         if self.hub is not None:
             hub.devices[name] = self
             self.hub.state[self.name] = self._state()
             self.hub.range[self.name] = {}
         self._connected = 0
+        self.connect_timeout = None     # seconds allowed by Hub.connect(); None uses the Hub default
 
         self.node_type = 'device'
 
@@ -67,8 +70,7 @@ class Device():
     @abstractmethod
     def _actuate(self, state):
         for key in state:
-            if state[key] != getattr(self, key):
-                setattr(self, key, state[key])
+            setattr(self, key, state[key])
 
     def _state(self):
         state = {}
@@ -76,25 +78,92 @@ class Device():
             state[prop] = getattr(self, prop)
         return state
 
+    def refresh(self, knob=None):
+        ''' Queries the device for the current value of a knob, or of all knobs,
+            bypassing the read cache. '''
+        knobs = self.knobs if knob is None else [knob]
+        if self.simulation:
+            return {name: getattr(self, name) for name in knobs}
+        state = {}
+        for name in knobs:
+            state[name] = getattr(type(self), name).refresh(self)
+            if self.hub is not None:
+                self.hub.state[self.name][name] = state[name]
+        return state
+
+    def set_max_age(self, knob, max_age):
+        ''' Overrides the read-cache policy of a knob on this device: 0 always
+            queries, a positive number reuses values read within that many
+            seconds, and None reuses the last value until the knob is set. '''
+        from emergent.core.knob import cache
+        cache(self).max_age[knob] = max_age
+
+    def set_tolerance(self, knob, tolerance):
+        ''' Sets the smallest change of a knob which actuate() will write to
+            hardware; smaller changes are skipped. '''
+        self.tolerance[knob] = tolerance
+
+    def invalidate(self, knobs=None):
+        ''' Marks knobs (default all) as possibly out of sync with Hub.state, so
+            that the next actuate() writes them even if unchanged. '''
+        self.stale.update(self.knobs if knobs is None else knobs)
+
+    def changes(self, state):
+        ''' Returns the subset of a state which differs from the last commanded
+            state in Hub.state by more than each knob's tolerance, plus any stale
+            knobs. The hardware is not queried. '''
+        if self.hub is None:
+            return state
+        last = self.hub.state.get(self.name, {})
+        changed = {}
+        for knob, value in state.items():
+            old = last.get(knob)
+            if old is None or knob in self.stale:
+                changed[knob] = value
+                continue
+            try:
+                if abs(float(value) - float(old)) > self.tolerance.get(knob, 0):
+                    changed[knob] = value
+            except (TypeError, ValueError):
+                if value != old:
+                    changed[knob] = value
+        return changed
+
+    def cache_stats(self):
+        ''' Returns the read-cache hits and misses of each knob. '''
+        from emergent.core.knob import cache
+        return cache(self).stats()
+
     @abstractmethod
     def _connect(self):
         """Private placeholder for the device-specific initiation method. """
         return 1
 
-    def actuate(self, state, send_over_p2p = True):
+    def actuate(self, state, send_over_p2p = True, force = False):
         """Makes a physical device change in the lab with the _actuate() method, then registers this change with EMERGENT.
 
         Args:
             state (dict): Target state of the form {'param1':value1, 'param2':value2,...}.
+            force (bool): if False, only knobs which differ from the last commanded
+                          state by more than their tolerance are written.
         """
         state = state.copy()
         for key in list(state.keys()):
             if state[key] is None:
                 del state[key]
-        self._actuate(state)
+        if not force:
+            state = self.changes(state)
+        if len(state) == 0:
+            return
+        try:
+            self._actuate(state)
+        except Exception:
+            self.invalidate(state)      # some knobs may have been written
+            raise
 
         ''' Update the state of the Knob, Device, and Hub '''
         for knob in state:
+            self.stale.discard(knob)
             if self.hub is not None:
                 self.hub.state[self.name][knob] = state[knob]   # update Hub
 
@@ -0,0 +1,99 @@
+'''
+    The Dispatcher runs calls for many keys (e.g. devices or hubs) on a bounded
+    thread pool. Calls sharing a key run one at a time in submission order, while
+    calls for different keys run concurrently, so that a state change touching
+    several devices takes the time of the slowest device rather than the sum.
+'''
+import threading
+import time
+import logging as log
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+class DispatchError(Exception):
+    ''' Raised after all calls of a run() complete if any of them failed. The
+        report attribute holds the latency and error of every call. '''
+    def __init__(self, report):
+        failed = [key for key in report if report[key]['error'] is not None]
+        super().__init__('Failed: %s'%', '.join('%s (%s)'%(key, report[key]['error']) for key in failed))
+        self.report = report
+
+class Dispatcher():
+    def __init__(self, max_workers=8):
+        ''' Args:
+                max_workers (int): maximum number of calls running at once
+        '''
+        self.max_workers = max_workers
+        self.executor = None
+        self.lock = threading.Lock()
+        self.lanes = {}         # key: deque of pending (future, func, args, kwargs)
+        self.active = set()     # keys with a drain task scheduled
+
+    def submit(self, key, func, *args, **kwargs):
+        ''' Schedules a call after any pending calls with the same key and
+            returns a Future holding its result. '''
+        future = Future()
+        future.submitted = time.perf_counter()
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            self.lanes.setdefault(key, deque()).append((future, func, args, kwargs))
+            start = key not in self.active
+            self.active.add(key)
+        if start:
+            self.executor.submit(self._drain, key)
+        return future
+
+    def _drain(self, key):
+        ''' Runs the pending calls of a key in order until none remain. '''
+        while True:
+            with self.lock:
+                if len(self.lanes[key]) == 0:
+                    self.active.discard(key)
+                    return
+                future, func, args, kwargs = self.lanes[key].popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            future.started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                future.finished = time.perf_counter()
+                future.set_exception(e)
+            else:
+                future.finished = time.perf_counter()
+                future.set_result(result)
+
+    def run(self, calls, timeout=None):
+        ''' Runs a dict of {key: (func, args)} calls concurrently and waits for
+            all of them. Returns a report of each call's queueing delay, latency
+            and error; raises DispatchError after all calls finish if any failed.
+        '''
+        futures = {key: self.submit(key, func, *args) for key, (func, args) in calls.items()}
+        wait(futures.values(), timeout=timeout)
+        report = {}
+        for key, future in futures.items():
+            if not future.done():
+                report[key] = {'wait': None, 'latency': None, 'error': 'timed out'}
+                continue
+            error = future.exception()
+            report[key] = {'wait': future.started - future.submitted,
+                           'latency': future.finished - future.started,
+                           'error': None if error is None else repr(error)}
+        failed = [key for key in report if report[key]['error'] is not None]
+        for key in failed:
+            log.error('Dispatch to %s failed: %s', key, report[key]['error'])
+        if len(failed) > 0:
+            raise DispatchError(report)
+        return report
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __getstate__(self):
+        return {'max_workers': self.max_workers}
+
+    def __setstate__(self, d):
+        self.__init__(d['max_workers'])
@@ -8,9 +8,12 @@
     and for optimizing itself by interfacing with other modules.
 '''
 import json
+import threading
+import time
 import logging as log
 from emergent.utilities.containers import DataDict
 from emergent.core import Node
+from emergent.core.dispatch import Dispatcher, DispatchError
 from emergent.utilities.persistence import __getstate__
 
 class Hub(Node):
@@ -35,29 +38,59 @@ class Hub(Node):
         self.samplers = {}
         self.node_type = 'hub'
         self.ignored = []
+        self.concurrent = False         # actuate devices in parallel
+        self.dispatcher = Dispatcher()
+        self.actuation = {}             # per-device latency and errors of the last concurrent actuation
+        self.connect_timeout = 10       # default time in seconds allowed for each device to connect
+        self.startup = {}               # per-device connection latency and errors
+        self.online = False
         self.__getstate__ = lambda: __getstate__(['samplers', 'core', 'options'])
 
-    def actuate(self, state, send_over_p2p = True):
+    def actuate(self, state, send_over_p2p = True, concurrent = None, force = False):
         """Updates all Knobs in the given state to the given values and optionally logs the state.
 
         Args:
             state (dict): Target state in nested dict form
+            concurrent (bool): if True, actuate the Devices in parallel through
+                               self.dispatcher, keeping the order of commands to
+                               each Device. Defaults to self.concurrent.
+            force (bool): if True, write every knob in the state; otherwise only
+                          knobs which differ from self.state are written.
         """
-        for device in state:
-            self.devices[device].actuate(state[device], send_over_p2p)
+        if concurrent is None:
+            concurrent = self.concurrent
+        if concurrent and len(state) > 1:
+            calls = {device: (self.devices[device].actuate, (state[device], send_over_p2p, force)) for device in state}
+            try:
+                self.actuation = self.dispatcher.run(calls)
+            except DispatchError as e:
+                self.actuation = e.report
+                raise
+        else:
+            for device in state:
+                self.devices[device].actuate(state[device], send_over_p2p, force)
 
         self.buffer.add(state)
         if send_over_p2p:
             self.core.emit('actuate', {self.name: self.state})
 
-    def load(self):
-        ''' Load knob states from file. '''
+    def load(self, actuate=False):
+        ''' Load knob states from file. If actuate is True, knobs whose stored
+            state differs from the current one are also written to hardware. '''
         try:
             with open(self.core.path['state']+self.name+'.json', 'r') as file:
                 state = DataDict(json.load(file))
         except FileNotFoundError:
             state = DataDict({})
-        self.state.patch(state.find('state', label=False))
+        if actuate:
+            stored = state.find('state', label=False)
+            target = {}
+            for device in stored:
+                if device in self.devices:
+                    target[device] = {knob: stored[device][knob] for knob in stored[device] if knob in self.state[device]}
+            self.actuate(target)
+        else:
+            self.state.patch(state.find('state', label=False))
         self.range.patch(state.find('min'))
         self.range.patch(state.find('max'))
 
@@ -80,8 +113,71 @@ class Hub(Node):
     #         state[dev.name] = dev._state()
     #     return state
 
+    def connect(self):
+        """Connects all Devices in parallel, allowing each its connect_timeout
+        (or self.connect_timeout if unset). Devices which time out keep connecting
+        in the background, and their stored state is written once they connect.
+        Returns a report of the connection latency and error of each Device,
+        which is also stored in self.startup.
+        """
+        lock = threading.Lock()
+
+        def connect(device, result):
+            start = time.perf_counter()
+            error = None
+            try:
+                device._connected = device._connect()
+            except Exception as e:
+                error = repr(e)
+            with lock:
+                result['latency'] = time.perf_counter() - start
+                if not result['timed out']:
+                    result['error'] = error
+                    return
+            if error is not None:
+                log.error('%s/%s failed to connect: %s', self.name, device.name, error)
+                return
+            log.info('%s/%s connected after %.3f s; writing its stored state.', self.name, device.name, result['latency'])
+            try:
+                self.actuate({device.name: self.state[device.name]}, force=True)
+            except Exception as e:
+                log.error('Could not actuate %s/%s: %s', self.name, device.name, e)
+
+        threads = {}
+        report = {}
+        for name, device in self.devices.items():
+            report[name] = {'latency': None, 'error': None, 'timed out': False}
+            threads[name] = threading.Thread(target=connect, args=(device, report[name]), daemon=True)
+            threads[name].start()
+        start = time.perf_counter()
+        for name, thread in threads.items():
+            timeout = self.devices[name].connect_timeout
+            if timeout is None:
+                timeout = self.connect_timeout
+            thread.join(max(0, start + timeout - time.perf_counter()))
+            with lock:
+                if report[name]['latency'] is None:
+                    report[name]['timed out'] = True
+                    report[name]['error'] = 'timed out after %g s'%timeout
+        for name in report:
+            if report[name]['error'] is None:
+                log.info('%s/%s connected in %.3f s.', self.name, name, report[name]['latency'])
+            else:
+                log.error('%s/%s failed to connect: %s', self.name, name, report[name]['error'])
+        self.startup = report
+        return report
+
     def _on_load(self):
-        """Tasks to be carried out after all Devices and Knobs are initialized."""
-        for device in self.devices.values():
-            device._connected = device._connect()
-        self.actuate(self.state)
+        """Tasks to be carried out after all Devices and Knobs are initialized:
+        connects the Devices, then writes the loaded state to those which
+        connected without error. The others are marked stale, so that their
+        state is written by the next actuation rather than skipped as unchanged."""
+        report = self.connect()
+        state = {}
+        for device in self.state:
+            if report.get(device, {}).get('error') is None:
+                state[device] = self.state[device]
+            else:
+                self.devices[device].invalidate()
+        self.actuate(state, force=True)
+        self.online = True
@@ -2,23 +2,60 @@
 This module contains classes and methods for the property-based device state
 representation. This is based around the @knob decorator.
 
+Reads can be cached per device to avoid repeated hardware queries. Each knob has a
+max_age policy: 0 queries the device on every read (the default), a positive number
+reuses a value read within that many seconds, and None reuses the last value until
+it is invalidated. Setting a knob invalidates its cached value, and refresh()
+forces a query.
 '''
+import time
+
+class KnobCache():
+    ''' Per-device store of cached knob values, max-age overrides, and hit/miss
+        counters. '''
+    def __init__(self):
+        self.values = {}        # knob name: (value, time of query)
+        self.max_age = {}       # knob name: max-age overriding the knob default
+        self.hits = {}
+        self.misses = {}
+
+    def invalidate(self, name=None):
+        ''' Discards the cached value of a knob, or of all knobs if name is None. '''
+        if name is None:
+            self.values = {}
+        else:
+            self.values.pop(name, None)
+
+    def stats(self):
+        ''' Returns the number of cache hits and misses for each knob. '''
+        names = set(self.hits) | set(self.misses)
+        return {name: {'hits': self.hits.get(name, 0), 'misses': self.misses.get(name, 0)} for name in names}
+
+def cache(obj):
+    ''' Returns the KnobCache of a device, creating it if needed. '''
+    if '_knob_cache' not in obj.__dict__:
+        obj.__dict__['_knob_cache'] = KnobCache()
+    return obj.__dict__['_knob_cache']
+
 class knob(object):
     ''' Tagging a method with @knob constructs a property. The property can be read by
         accessing its class attribute, e.g. device.x, and set in the usual way, device.x=y.
         The command() and query() methods allow implementation of user-defined device
         communications. Tagging a method with x.command will execute the command before setting x,
         while tagging with x.query will request and return a state from the device. '''
-    def __init__(self, name, getter=None, setter=None, read_only=False):
+    def __init__(self, name, getter=None, setter=None, read_only=False, max_age=0):
         self.name = name
         self.getter = getter
         self.setter = setter
         self.read_only = read_only
+        self.max_age = max_age
 
     def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
         try:
             if not obj.simulation:
-                val = self.getter(obj)
+                val = self.read(obj)
             else:
                 val = obj.__dict__['_'+self.name]
             obj.state[self.name] = val
@@ -26,11 +63,32 @@ class knob(object):
         except AttributeError:
             return None
 
+    def read(self, obj):
+        ''' Returns the cached value if it is recent enough under the knob's
+            max-age policy, and queries the device otherwise. '''
+        c = cache(obj)
+        max_age = c.max_age.get(self.name, self.max_age)
+        if max_age != 0 and self.name in c.values:
+            val, t = c.values[self.name]
+            if max_age is None or time.time() - t <= max_age:
+                c.hits[self.name] = c.hits.get(self.name, 0) + 1
+                return val
+        return self.refresh(obj)
+
+    def refresh(self, obj):
+        ''' Queries the device and updates the cached value. '''
+        c = cache(obj)
+        c.misses[self.name] = c.misses.get(self.name, 0) + 1
+        val = self.getter(obj)
+        c.values[self.name] = (val, time.time())
+        return val
+
     def __set__(self, obj, value):
         ''' Calls the user-defined command. To avoid offloading boilerplate to the users,
             this method also updates the property value with the new signal. '''
         if not obj.simulation:
             self.setter(obj, value)
+        cache(obj).invalidate(self.name)
         obj.__dict__['_'+self.setter.__name__] = value
         obj.state[self.name] = value
         if obj.hub is not None:
@@ -39,16 +97,21 @@ class knob(object):
     def command(self, setter):
         ''' Command methods are used to send device commands before updating the internal
             state representation. '''
-        return type(self)(self.name, self.getter, setter, read_only=self.read_only)
+        return type(self)(self.name, self.getter, setter, read_only=self.read_only, max_age=self.max_age)
 
     def query(self, getter):
         ''' Query methods are used to request the current state from the device
             (as opposed to returning the last device set by EMERGENT). Supposing
             we have a property x, the decorator @x.query is used to construct a new
             instance of the property and call __get__ using the tagged method. '''
-        return type(self)(self.name, getter, self.setter, read_only=self.read_only)
+        return type(self)(self.name, getter, self.setter, read_only=self.read_only, max_age=self.max_age)
+
+    def cached(self, max_age=None):
+        ''' Returns a copy of the property with a new max-age policy, e.g.
+            x = Knob('x').cached(1) reuses values read within the last second. '''
+        return type(self)(self.name, self.getter, self.setter, read_only=self.read_only, max_age=max_age)
 
-def Knob(name):
+def Knob(name, max_age=0):
     ''' Convenience function for constructing properties with default getter/setter behavior. '''
     def getter(self):
         ''' Default getter: if tagging a method device.x(), returns device._x.'''
@@ -64,13 +127,13 @@ def Knob(name):
         if self.hub is not None:
             self.hub.state[self.name][name] = newval
         setattr(self, _name, newval)
-    return knob(name, getter, setter)
+    return knob(name, getter, setter, max_age=max_age)
 
-def Sensor(name):
+def Sensor(name, max_age=0):
     def getter(self):
         _name = '_%s'%name
         return getattr(self, _name)
 
     def setter(self, newval):
         print("Sensor '%s.%s' value is read-only!"%(self.name, name))
-    return knob(name, getter, setter, read_only=True)
+    return knob(name, getter, setter, read_only=True, max_age=max_age)
@@ -30,7 +30,7 @@ class ModelLayout(QVBoxLayout):
         ''' Model select layout '''
         self.modelLayout = QVBoxLayout()
         self.model_box = QComboBox()
-        for item in ['None', 'GaussianProcess', 'NonlinearModel']:
+        for item in ['None', 'GaussianProcess', 'SparseGaussianProcess', 'Nonlinear']:
             self.model_box.addItem(item)
         label = QLabel('Model')
         label.setStyleSheet('color:"#000000"; font-weight: light; font-family: "Exo 2"; font-size: 14px; background-color: transparent')
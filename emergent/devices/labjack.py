@@ -1,8 +1,7 @@
 import numpy as np
 from emergent.core import Device
 import logging as log
-from emergent.drivers.labjack import LabJackDriver
-from labjack import ljm
+from emergent.drivers.labjack import LabJackDriver, ljm
 
 class LabJack(Device, LabJackDriver):
     def __init__(self, name = 'LabJack', hub = None, params = {'device': 'ANY', 'connection': 'ANY', 'devid': 'ANY', 'arange': 10}):
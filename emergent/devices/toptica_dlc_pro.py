@@ -9,8 +9,8 @@ class DLCPro(Device):
     def __init__(self, name, hub, params={'addr': '169.254.120.100'}):
         super().__init__(name, hub)
         self.addr = params['addr']
-        self.queue = FIFO()
-        self.queue.run()
+        self.queue = FIFO(name)
+        self.queue.start()
 
     def _connect(self):
         self.client = self._open_tcpip(self.addr, 1998)
@@ -0,0 +1,123 @@
+''' A stand-in for the labjack.ljm module which simulates a T7 in memory, so that
+    the LabJack driver can be tested and benchmarked without hardware. Select it
+    by setting the environment variable EMERGENT_FAKE_LJM=1 before importing
+    emergent.drivers.labjack.
+
+    Each simulated device holds a dict of register values. Every library call
+    sleeps for LATENCY seconds to model the round trip to the device and is
+    counted in calls, so that the cost of one call per register can be compared
+    with batched eReadNames/eWriteNames calls. Analog inputs read back the DAC
+    with the same index modulo two, plus NOISE volts of Gaussian noise.
+
+    Run this module to benchmark the driver:
+        python -m emergent.drivers.fake_ljm
+'''
+import time
+import numpy as np
+from collections import Counter
+from types import SimpleNamespace
+
+LATENCY = 0.0005
+NOISE = 0.001
+
+constants = SimpleNamespace(dtT7=7, dtT4=4, dtANY=0, GND=199)
+
+class LJMError(Exception):
+    pass
+
+devices = {}
+calls = Counter()
+
+def _device(handle):
+    time.sleep(LATENCY)
+    try:
+        return devices[handle]
+    except KeyError:
+        raise LJMError('Invalid handle %s.'%handle)
+
+def _read(device, name):
+    if name.startswith('AIN') and name[3:].isdigit():
+        return device.get('DAC%i'%(int(name[3:]) % 2), 0.0) + np.random.normal(0, NOISE)
+    return device.get(name, 0.0)
+
+def openS(device_type='ANY', connection_type='ANY', identifier='ANY'):
+    calls['openS'] += 1
+    handle = len(devices) + 1
+    devices[handle] = {}
+    return handle
+
+def close(handle):
+    calls['close'] += 1
+    devices.pop(handle, None)
+
+def getHandleInfo(handle):
+    calls['getHandleInfo'] += 1
+    _device(handle)
+    return constants.dtT7, 3, 470000000 + handle, 0, 0, 1040
+
+def eWriteName(handle, name, value):
+    calls['eWriteName'] += 1
+    _device(handle)[name] = float(value)
+
+def eWriteNames(handle, num_frames, names, values):
+    calls['eWriteNames'] += 1
+    device = _device(handle)
+    for name, value in zip(names[:num_frames], values[:num_frames]):
+        device[name] = float(value)
+
+def eReadName(handle, name):
+    calls['eReadName'] += 1
+    return _read(_device(handle), name)
+
+def eReadNames(handle, num_frames, names):
+    calls['eReadNames'] += 1
+    device = _device(handle)
+    return [_read(device, name) for name in names[:num_frames]]
+
+def eWriteNameByteArray(handle, name, num_bytes, data):
+    calls['eWriteNameByteArray'] += 1
+    _device(handle)[name] = list(data[:num_bytes])
+
+def namesToAddresses(num_frames, names):
+    addresses = [2*int(name[3:]) if name.startswith('AIN') else 0 for name in names[:num_frames]]
+    return addresses, [3]*num_frames
+
+def eStreamStart(handle, scans_per_read, num_addresses, scan_list, scan_rate):
+    calls['eStreamStart'] += 1
+    _device(handle)['streaming'] = 1
+    return scan_rate
+
+def eStreamStop(handle):
+    calls['eStreamStop'] += 1
+    device = _device(handle)
+    if not device.pop('streaming', 0):
+        raise LJMError('Stream is not running.')
+
+def streamBurst(handle, num_addresses, scan_list, scan_rate, num_scans):
+    calls['streamBurst'] += 1
+    time.sleep(num_scans/scan_rate)
+    return scan_rate, list(np.random.normal(0, NOISE, num_scans*num_addresses))
+
+def writeLibraryConfigS(parameter, value):
+    calls['writeLibraryConfigS'] += 1
+
+if __name__ == '__main__':
+    import os
+    from threading import Thread
+    os.environ['EMERGENT_FAKE_LJM'] = '1'
+    from emergent.drivers.labjack import LabJackDriver, ljm
+    for coalesce in [False, True]:
+        lj = LabJackDriver(params={'coalesce': coalesce})
+        ljm.calls.clear()
+        start = time.perf_counter()
+        def worker(channel):
+            for i in range(50):
+                lj.AOut(channel % 2, 1.0)
+                lj.AIn(channel, num=4)
+        threads = [Thread(target=worker, args=(channel,)) for channel in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print('coalesce=%s: %.3f s, %s'%(coalesce, time.perf_counter()-start, dict(ljm.calls)))
+        lj.manager._quit_thread(lj.queue.run)
@@ -1,10 +1,109 @@
-from labjack import ljm
+import os
+if os.environ.get('EMERGENT_FAKE_LJM', '0') == '1':
+    from emergent.drivers import fake_ljm as ljm
+else:
+    from labjack import ljm
 from emergent.core import ProcessHandler
 from emergent.utilities.fifo import FIFO
 import numpy as np
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
 from emergent.utilities.decorators import queue
 import logging as log
 
+class Coalescer():
+    ''' Collects single-register reads and writes from any number of threads and
+        executes them on the driver's FIFO queue in as few library calls as
+        possible. The first pending operation schedules a flush on the queue;
+        every operation submitted before the flush runs (for example while the
+        queue is busy with other commands, or within the optional window) is
+        executed by it. Operations keep their order: each run of consecutive
+        reads becomes one eReadNames call and each run of consecutive writes
+        one eWriteNames call. '''
+    def __init__(self, driver, window=0, timeout=5):
+        ''' Args:
+                driver (LabJackDriver): the driver whose handle and queue are used
+                window (float): minimum time in seconds that the oldest operation
+                                waits for others to join it
+                timeout (float): time in seconds to wait for an operation when
+                                 the queue has no timeout of its own
+        '''
+        self.driver = driver
+        self.window = window
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.pending = []
+
+    def read(self, registers):
+        ''' Returns the values of a list of registers. '''
+        return self.submit([('read', register, None) for register in registers])
+
+    def write(self, registers, values):
+        ''' Writes a list of values to a list of registers. '''
+        self.submit([('write', register, value) for register, value in zip(registers, values)])
+
+    def submit(self, operations):
+        ''' Executes a list of (kind, register, value) operations and returns
+            the read values. Calls made from the queue's worker thread (e.g.
+            within a @queue method) run immediately to avoid deadlock. '''
+        queue = self.driver.queue
+        timeout = queue.timeout if queue.timeout is not None else self.timeout
+        futures = [Future() for op in operations]
+        if threading.current_thread() is queue.worker:
+            self.execute([op + (future,) for op, future in zip(operations, futures)])
+        else:
+            with self.lock:
+                schedule = len(self.pending) == 0
+                for op, future in zip(operations, futures):
+                    self.pending.append(op + (future,))
+                if schedule:
+                    self.started = time.perf_counter()
+                    queue.submit(self.flush)
+        try:
+            results = [future.result(timeout) for future in futures]
+        except TimeoutError:
+            raise TimeoutError('LabJack %s did not complete %s within %g s.'%(self.driver.params['devid'],
+                               [op[1] for op in operations], timeout))
+        if operations[0][0] == 'read':
+            return results
+
+    def flush(self):
+        ''' Executes all pending operations. '''
+        remaining = self.started + self.window - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        with self.lock:
+            operations, self.pending = self.pending, []
+        self.execute(operations)
+
+    def execute(self, operations):
+        ''' Executes a list of (kind, register, value, future) operations in
+            order, batching consecutive operations of the same kind. '''
+        results = []
+        start = 0
+        while start < len(operations):
+            kind = operations[start][0]
+            end = start
+            while end < len(operations) and operations[end][0] == kind:
+                end += 1
+            run = operations[start:end]
+            registers = [op[1] for op in run]
+            try:
+                if kind == 'read':
+                    values = ljm.eReadNames(self.driver.handle, len(registers), registers)
+                else:
+                    ljm.eWriteNames(self.driver.handle, len(registers), registers, [float(op[2]) for op in run])
+                    values = [None]*len(run)
+                for op, value in zip(run, values):
+                    op[3].set_result(value)
+                    results.append(value)
+            except Exception as e:
+                for op in run:
+                    op[3].set_exception(e)
+            start = end
+        return results
+
 class LabJackDriver():
     ''' Python interface for the LabJack T7. '''
 
@@ -12,7 +111,11 @@ class LabJackDriver():
         ''' Attempt to connect to a LabJack.
 
             Args:
-                params (dict)
+                params (dict): connection parameters. If 'coalesce' is True (default),
+                               concurrent single-register reads and writes are merged
+                               into eReadNames/eWriteNames calls, waiting up to
+                               'window' seconds (default 0) for others to join, and
+                               raising TimeoutError after 'timeout' seconds (default 5).
         '''
         self.params = params
         self.stream_mode = None
@@ -25,12 +128,15 @@ class LabJackDriver():
         ''' Define a FIFO queue running in a separate thread so that multiple
             simultaneous threads can share a LabJack without interference. '''
         self.manager = ProcessHandler()
-        self.queue = FIFO()
+        self.queue = FIFO('LabJack %s'%self.params['devid'])
         self.picklable = False
         self.manager._run_thread(self.queue.run)
+        self.coalescer = None
+        if self.params.get('coalesce', True):
+            self.coalescer = Coalescer(self, self.params.get('window', 0), self.params.get('timeout', 5))
         self._connected = self.connect()
 
-        self.ignored = ['queue', 'manager']
+        self.ignored = ['queue', 'manager', 'coalescer']
 
     def connect(self):
         try:
@@ -77,7 +183,6 @@ class LabJackDriver():
                 channel = int(key[3])
                 self.channels[key] = self.AIn(channel)
 
-    @queue
     def _command(self, register, value):
         ''' Writes a value to a specified register.
 
@@ -85,25 +190,35 @@ class LabJackDriver():
                 register (str): a Modbus register on the LabJack.
                 value: the value to write to the register.
                 '''
-        ljm.eWriteName(self.handle, register, value)
+        if self.coalescer is not None:
+            return self.coalescer.write([register], [value])
+        self.queue.call(ljm.eWriteName, self.handle, register, value)
+
+    def _read(self, registers):
+        ''' Reads a list of registers, coalesced with concurrent reads if enabled. '''
+        if self.coalescer is not None:
+            return self.coalescer.read(registers)
+        return self._read_array(registers)
 
     @queue
     def _write_array(self, registers, values):
         ljm.eWriteNames(self.handle, len(registers), registers, values)
 
-    ''' Analog I/O '''
     @queue
+    def _read_array(self, registers):
+        ''' Reads several registers in a single eReadNames call. '''
+        return ljm.eReadNames(self.handle, len(registers), registers)
+
+    ''' Analog I/O '''
     def AIn(self, channel, num = 1):
-        ''' Read a channel with optional averaging.
+        ''' Read a channel with optional averaging. All measurements are made
+            in a single eReadNames call.
 
             Args:
                 channel (int): number of the target AIN channel.
                 num (int): number of measurements to perform and average.
         '''
-        vals = []
-        for i in range(num):
-            vals.append(ljm.eReadName(self.handle, 'AIN%i'%channel))
-        return np.mean(vals)
+        return np.mean(self._read(['AIN%i'%channel]*num))
 
     def AOut(self, channel, value, TDAC=False):
         ''' Output an analog voltage.
@@ -120,7 +235,7 @@ class LabJackDriver():
 
     ''' Digital I/O '''
     def DIn(self, channel):
-        return ljm.eReadName(self.handle, 'DIO%i'%channel)
+        return self._read(['DIO%i'%channel])[0]
 
     def DOut(self, channel, state):
         ''' Output a digital signal.
@@ -1,9 +1,9 @@
 from emergent.utilities.containers import Parameter
 from emergent.utilities.decorators import algorithm
 import numpy as np
-from sklearn.gaussian_process import GaussianProcessRegressor
 from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C, WhiteKernel
 from emergent.modeling.models.model import Model
+from emergent.utilities.regression import IncrementalGaussianProcess
 import pickle
 
 class GaussianProcess(Model):
@@ -24,11 +24,22 @@ class GaussianProcess(Model):
                                             min = 0,
                                             max = 10,
                                             description = 'Amplitude of modeled white noise process')
+        self.params['Refit interval'] = Parameter(name= 'Refit interval',
+                                            value = 10,
+                                            type = int,
+                                            min = 1,
+                                            description = 'New points between kernel re-optimizations')
+        self.params['Drift tolerance'] = Parameter(name= 'Drift tolerance',
+                                            value = 0.5,
+                                            min = 0,
+                                            description = 'Change in log-likelihood per point which triggers kernel re-optimization')
         kernel = C(self.params['Amplitude'].value, (1e-3, 1e3)) * RBF(self.params['Length scale'].value, (1e-2, 1e2)) + WhiteKernel(self.params['Noise'].value)
-        self.model = GaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=10)
+        self.model = IncrementalGaussianProcess(kernel=kernel, restarts=10)
         self.extension = '.gp'
 
     def fit(self):
+        self.model.refit_interval = self.params['Refit interval'].value
+        self.model.drift_tolerance = self.params['Drift tolerance'].value
         self.model.fit(self.points, self.costs)
 
     def predict(self, X):
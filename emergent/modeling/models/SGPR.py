@@ -0,0 +1,56 @@
+from emergent.utilities.containers import Parameter
+import numpy as np
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C, WhiteKernel
+from emergent.modeling.models.model import Model
+from emergent.utilities.regression import SparseGaussianProcess as SparseRegressor
+import pickle
+
+class SparseGaussianProcess(Model):
+    def __init__(self):
+        super().__init__('SparseGaussianProcess')
+        self.params['Amplitude'] = Parameter(name= 'Kernel amplitude',
+                                            value = 1,
+                                            min = 0,
+                                            max = 10,
+                                            description = 'Amplitude of modeled cost landscape')
+        self.params['Length scale'] = Parameter(name= 'Kernel length scale',
+                                            value = 1,
+                                            min = 0,
+                                            max = 10,
+                                            description = 'Characteristic size of cost landscape')
+        self.params['Noise'] = Parameter(name= 'Kernel noise',
+                                            value = 0.1,
+                                            min = 0,
+                                            max = 10,
+                                            description = 'Amplitude of modeled white noise process')
+        self.params['Inducing points'] = Parameter(name= 'Inducing points',
+                                            value = 50,
+                                            type = int,
+                                            min = 1,
+                                            description = 'Number of points summarizing the cost landscape')
+        self.params['Window'] = Parameter(name= 'Window',
+                                            value = 1000,
+                                            type = int,
+                                            min = 1,
+                                            description = 'Maximum number of recent or low-cost points retained for training')
+        kernel = C(self.params['Amplitude'].value, (1e-3, 1e3)) * RBF(self.params['Length scale'].value, (1e-2, 1e2)) + WhiteKernel(self.params['Noise'].value)
+        self.model = SparseRegressor(kernel=kernel)
+        self.extension = '.sgp'
+
+    def fit(self):
+        self.model.inducing = self.params['Inducing points'].value
+        self.model.window = self.params['Window'].value
+        self.model.fit(self.points, self.costs)
+
+    def predict(self, X):
+        return self.model.predict(np.atleast_2d(X), return_std = True)
+
+    def _export(self):
+        filename = self.sampler.hub.core.path['data'] + 'weights' + self.extension
+        with open(filename, 'wb') as file:
+            pickle.dump(self.model, file)
+
+    def _import(self):
+        filename = self.sampler.hub.core.path['data'] + 'weights' + self.extension
+        with open(filename, 'rb') as file:
+            self.model = pickle.load(file)
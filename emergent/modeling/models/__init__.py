@@ -1,2 +1,3 @@
 from .GPR import GaussianProcess
 from .nonlinear import Nonlinear
+from .SGPR import SparseGaussianProcess
@@ -1,9 +1,19 @@
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from scipy.optimize import minimize
-from emergent.utilities.plotting import plot_2D
 from emergent.utilities.containers import Parameter
 from scipy.stats import norm
 
+def _polish(model, x0, bounds, b):
+    ''' Locally minimizes the acquisition function of a model from a starting
+        point. Defined at module level so that it can be run in worker processes. '''
+    res = minimize(fun=model.effective_cost,
+                   x0=x0,
+                   bounds=bounds,
+                   method='L-BFGS-B',
+                   args=(b,))
+    return res.x, np.atleast_1d(res.fun)[0]
+
 class Model():
     def __init__(self, name=None):
         self.name = name
@@ -13,8 +23,32 @@ class Model():
                                             min = 0.01,
                                             max = 0.25,
                                             description = 'Allowed search range relative to last best point')
+        self.params['Candidates'] = Parameter(name= 'Candidates',
+                                            value = 1000,
+                                            type = int,
+                                            min = 1,
+                                            description = 'Random points screened on the response surface per acquisition')
+        self.params['Restarts'] = Parameter(name= 'Restarts',
+                                            value = 5,
+                                            type = int,
+                                            min = 1,
+                                            description = 'Best candidates polished with L-BFGS-B per acquisition')
+        self.params['Processes'] = Parameter(name= 'Processes',
+                                            value = 1,
+                                            type = int,
+                                            min = 1,
+                                            description = 'Worker processes used to polish candidates; 1 runs in-process')
         self.imported = False
         self.extension = None
+        self._pool = None
+
+    def __getstate__(self):
+        ''' Excludes the parent sampler and worker pool when sending the model to worker processes. '''
+        state = self.__dict__.copy()
+        state['sampler'] = None
+        state['_pool'] = None
+        return state
+
     def append(self, point, cost):
         self.points = np.append(np.atleast_2d(self.points), np.atleast_2d(point), axis=0)
         self.costs = np.append(self.costs, cost)
@@ -33,35 +67,46 @@ class Model():
     def minimum(self):
         return self.next_sample(1)
 
-    def next_sample(self, b, restarts=25):
+    def next_sample(self, b, restarts=None):
         ''' Generates the next sampling point by minimizing cost on the virtual
-            response surface. '''
-        X = self.points
-        best_x = None
-        best_acquisition_value = 999
+            response surface. A batch of random candidates within the leash of
+            the last best point is screened with a single call to predict, then
+            the best few candidates are polished with L-BFGS-B, in parallel if
+            the Processes parameter is greater than one. '''
+        if restarts is None:
+            restarts = self.params['Restarts'].value
         best_point = self.points[np.argmin(self.costs)]
         leash = self.params['Leash'].value
 
-        ''' Form random vector within allowed range of last best point '''
-        x0 = np.zeros((X.shape[1], restarts))
-        leashed_bounds = []
-        for i in range(X.shape[1]):
-            xmin = np.max([best_point[i] - leash, 0])
-            xmax = np.min([best_point[i] + leash, 1])
-            leashed_bounds.append([xmin, xmax])
-            x0[i] =  np.random.uniform(xmin, xmax, restarts)
-        x0 = x0.T
-        for starting_point in x0:
-            res = minimize(fun=self.effective_cost,
-                       x0=starting_point.reshape(1, -1),
-                       bounds=leashed_bounds,
-                       method='L-BFGS-B',
-                       args=(b,))
-            if res.fun < best_acquisition_value:
-                best_acquisition_value = res.fun
-                best_x = res.x
-
-        return best_x
+        ''' Form random candidates within allowed range of last best point '''
+        xmin = np.maximum(best_point - leash, 0)
+        xmax = np.minimum(best_point + leash, 1)
+        leashed_bounds = list(zip(xmin, xmax))
+        candidates = np.random.uniform(xmin, xmax, (max(self.params['Candidates'].value, restarts), len(best_point)))
+        acquisition = self.effective_cost(candidates, b)
+        order = np.argsort(acquisition)
+        starts = candidates[order[:restarts]]
+
+        ''' Polish the best candidates '''
+        processes = self.params['Processes'].value
+        if processes > 1 and len(starts) > 1:
+            pool = self.get_pool(processes)
+            n = len(starts)
+            results = list(pool.map(_polish, [self]*n, starts, [leashed_bounds]*n, [b]*n))
+        else:
+            results = [_polish(self, x0, leashed_bounds, b) for x0 in starts]
+        results.append((starts[0], acquisition[order[0]]))
+
+        return min(results, key=lambda r: r[1])[0]
+
+    def get_pool(self, processes):
+        ''' Returns a process pool with the requested number of workers, which is
+            kept alive between acquisitions to avoid startup overhead. '''
+        if self._pool is None or self._pool._max_workers != processes:
+            if self._pool is not None:
+                self._pool.shutdown()
+            self._pool = ProcessPoolExecutor(max_workers=processes)
+        return self._pool
 
     def predict(self, state):
         ''' Override for a given model with the specific prediction method used. '''
@@ -88,4 +133,5 @@ class Model():
         predict_costs, predict_uncertainties = self.predict(predict_points)
         predict_costs *= -1
 
+        from emergent.utilities.plotting import plot_2D
         return plot_2D(predict_points, predict_costs, limits=self.sampler.get_limits())
@@ -4,7 +4,6 @@ import numpy as np
 from sklearn.gaussian_process import GaussianProcessRegressor
 from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C, WhiteKernel
 from scipy.optimize import minimize
-from emergent.utilities.plotting import plot_2D
 from emergent.modeling.models.model import Model
 from scipy.optimize import curve_fit
 
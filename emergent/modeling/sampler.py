@@ -15,6 +15,8 @@ import uuid
 from emergent.utilities import recommender
 from emergent.modeling.scaler import Scaler
 from emergent.utilities.decorators import thread
+from emergent.utilities.runlog import RunLog
+from emergent.utilities.buffers import RingBuffer
 
 class Sampler():
     ''' General methods '''
@@ -52,6 +54,7 @@ class Sampler():
             self.algorithm_params = settings['servo']['params']
             self.algorithm.set_params(self.algorithm_params)
         self.skip_lock_check = False           # if True, experiments will disregard watchdog state
+        self.history_length = settings['process'].get('history length', 100000)    # samples retained in memory
 
         self.model = None
         if 'model' in settings:
@@ -72,7 +75,7 @@ class Sampler():
     def __getstate__(self):
         d = {}
         d['experiment_name'] = self.experiment.__name__
-        for x in ['limits', 'model', 'algorithm_params', 'experiment_params', 'history', 'state', 'name', 'knobs', 'start_time', 'hub', 'experiment', 'algorithm']:
+        for x in ['limits', 'model', 'algorithm_params', 'experiment_params', 'log', 'state', 'name', 'knobs', 'start_time', 'hub', 'experiment', 'algorithm']:
             d[x] = self.__dict__[x]
 
         return d
@@ -112,30 +115,39 @@ class Sampler():
         ''' Set a flag to terminate a process early through the callback check. '''
         self.active = False
 
-    def get_history(self):
-        ''' Return a multidimensional array and corresponding points from the history df'''
-        arrays = []
-        state = {}
-        costs = self.history['cost'].values
-        errors = None
-        if 'error' in self.history.columns:
-            errors = self.history['error'].values
-            if np.isnan(errors).any():
-                errors = None
-        t = self.history.index.values
-        for col in self.history.columns:
-            if col not in ['cost', 'error']:
-                arrays.append(self.history[col].values)
-                device = col.split(':')[0]
-                knob = col.split(':')[1]
-                if device not in state.keys():
-                    state[device] = {}
-                state[device][knob] = 0
-        if len(arrays) > 0:
-            points = np.vstack(arrays).T.astype(float)
-        else:
-            points = None
-        costs = costs.astype(float)
+    @property
+    def history(self):
+        ''' A DataFrame of the most recent samples, indexed by time, with
+            normalized knob values followed by the cost and its error. The full
+            history is kept in the run log. '''
+        return self.buffer.frame()
+
+    def record(self, state, cost, error=None, t=None):
+        ''' Adds a sample at a normalized state to the history and streams it
+            to the run log. '''
+        if t is None:
+            t = time.time()
+        row = [t]
+        for device in self.knobs:
+            for knob in self.knobs[device]:
+                row.append(state.get(device, {}).get(knob, np.nan))
+        row.extend([cost, np.nan if error is None else error])
+        self.buffer.append(row)
+        self.log.append(row)
+
+    def get_history(self, start=0, stop=None):
+        ''' Return the sample times, a multidimensional array of normalized points,
+            the costs, and their errors (or None if not measured) for the retained
+            samples, optionally sliced as [start:stop]. '''
+        rows = self.buffer.array(start, stop)
+        t = rows[:, 0]
+        costs = rows[:, -2]
+        errors = rows[:, -1]
+        if np.isnan(errors).any():
+            errors = None
+        points = None
+        if len(self.columns) > 3:
+            points = rows[:, 1:-2]
 
         return t, points, costs, errors
 
@@ -145,12 +157,16 @@ class Sampler():
             unnormalizes it, and returns cost evaluated on the result. '''
         if type(state) is np.ndarray:
             norm_target = self.scaler.array2state(state)
+            if norm:
+                target = self.scaler.array2state(self.scaler.unnormalize_array(state))
+            else:
+                target = norm_target
         else:
             norm_target = state
-        if norm:
-            target = self.scaler.unnormalize(norm_target)
-        else:
-            target = norm_target
+            if norm:
+                target = self.scaler.unnormalize(norm_target)
+            else:
+                target = norm_target
         # if not self.skip_lock_check:
             # self.hub._check_lock()
 
@@ -168,24 +184,15 @@ class Sampler():
         if len(results) > 1:
             error = np.std(results)/np.sqrt(len(results))
 
-        ''' Update history '''
-        t = time.time()
-        self.history.loc[t, 'cost'] = c
-        self.history.loc[t, 'error'] = error
-        for device in target:
-            for knob in target[device]:
-                self.history.loc[t, device+':'+knob] = norm_target[device][knob]
+        self.record(norm_target, c, error)
         return c
 
     def get_limits(self):
         ''' Get the limits of all knobs in self.history from the Hub. '''
         limits = {}
-        for col in self.history.columns:
-            if col in ['cost', 'error']:
-                continue
-            device = col.split(':')[0]
-            knob = col.split(':')[1]
-            limits[col] = self.limits[device][knob]
+        for device in self.knobs:
+            for knob in self.knobs[device]:
+                limits[device+':'+knob] = self.limits[device][knob]
 
         return limits
 
@@ -200,8 +207,15 @@ class Sampler():
                 num_items += 1
                 self.knobs[device].append(knob)
         state = self.scaler.normalize(state)
-        cols.append('cost')
-        self.history = pd.DataFrame(columns=cols)
+        self.columns = ['time'] + cols + ['cost', 'error']
+        self.buffer = RingBuffer(self.columns, self.history_length)
+        path = self.hub.core.path['data'] + '%s - %s - %s.run'%(self.start_time.replace(':',''), self.experiment.__name__, self.id[:8])
+        self.log = RunLog(path, self.columns, metadata={'hub': self.hub.name,
+                                                        'experiment': self.experiment.__name__,
+                                                        'experiment_params': self.experiment_params,
+                                                        'algorithm_params': self.algorithm_params,
+                                                        'knobs': self.knobs,
+                                                        'limits': self.get_limits()})
         bounds = np.array(list(itertools.repeat([0, 1], num_items)))
         state = self.scaler.state2array(state)
 
@@ -216,9 +230,10 @@ class Sampler():
         return self.points, self.costs
 
     def save(self, filename):
-        ''' Byte-serialize the sampler and all attached picklable objects and
-            save to file. '''
-        self.history.to_csv(self.hub.core.path['data']+filename+'.csv')
+        ''' Closes the run log, then byte-serializes the sampler and all attached
+            picklable objects and saves to file. The pickle refers to the run
+            log for the sampled data. '''
+        self.log.close()
         self.hub.macro_buffer.add(self.hub.state)
         try:
             with open(self.hub.core.path['data']+'%s.sci'%filename, 'wb') as file:
@@ -1,6 +1,5 @@
 from emergent.utilities.containers import Parameter
 import numpy as np
-from emergent.utilities.plotting import plot_2D
 from emergent.modeling.samplers.sampling import Sampling
 
 class Grid(Sampling):
@@ -1,6 +1,5 @@
 from emergent.utilities.containers import Parameter
 import numpy as np
-from emergent.utilities.plotting import plot_2D
 
 class Sampling():
     def __init__(self, sampler = None):
@@ -48,4 +47,5 @@ class Sampling():
             self.params[p].value = params[p]
 
     def plot(self):
+        from emergent.utilities.plotting import plot_2D
         return plot_2D(self.points, -self.costs, limits=self.sampler.get_limits())
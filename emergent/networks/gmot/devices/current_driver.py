@@ -86,7 +86,7 @@ class CurrentDriver(Device):
                 plt.ylabel('Current (I)')
                 plt.show()
             self.labjack.AOut(coil-1, 0)
-        self.actuate(self.state)
+        self.actuate(self.state, force=True)
 
     def enable_setpoint(self, ch):
         ''' Only works with ch = 1 or 2 '''
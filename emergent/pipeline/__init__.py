@@ -1,3 +1,5 @@
+from .history import History
+from .budget import Budget, BudgetExhausted
 from .block import Block
 from .base import BasePipeline
 from .blocks import *
@@ -1,16 +1,16 @@
 import numpy as np
 import importlib
 import inspect
-import matplotlib.pyplot as plt
 import logging as log
 import time
 from abc import abstractmethod
 
 class BasePipeline:
+    batch = False       # whether measure_batch evaluates a population in one call
+
     def __init__(self):
         self.blocks = []
-        self.points = np.atleast_2d([])
-        self.costs = np.array([])
+        self.history = None
 
     def add(self, block):
         self.blocks.append(block)
@@ -23,6 +23,23 @@ class BasePipeline:
     def measure(self, point):
         return
 
+    def measure_batch(self, points):
+        ''' Evaluates the cost at each row of a 2D array of points. Reimplement
+            for pipelines which can evaluate a whole population at once. '''
+        return np.array([self.measure(point) for point in np.atleast_2d(points)])
+
+    def submit(self, point):
+        ''' Schedules a physical measurement at a point and returns a Future
+            holding its cost. Delegates to the parent pipeline. '''
+        return self.pipeline.submit(point)
+
+    def synchronize(self):
+        ''' Waits for any measurements still in flight in this pipeline or its
+            subpipelines and records them. '''
+        for block in self.blocks:
+            if hasattr(block, 'synchronize'):
+                block.synchronize()
+
     def from_json(self, block_dict, subblock=None):
         ''' Recursively constructs blocks and subpipelines to prepare a pipeline
             from the passed dict. '''
@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 import time
 import numpy as np
 
@@ -12,54 +11,57 @@ class Block():
             self.pipeline.add(self)
             self.pipeline.run()
 
-    def _run(self, points, costs, bounds=None):
-        self.start_index = len(points)
-        points, costs = self.run(points, costs, bounds)
-        self.end_index = len(points)
+    def _run(self, history, bounds=None):
+        self.start_index = len(history)
+        self.run(history, bounds)
+        self.end_index = len(history)
 
-        return points, costs
-
-    def tune(self, parameter, bounds, steps=20, mode='cumulative'):
-        ''' Args:
-                parameter (str): the parameter to optimize
-                bounds (tuple): optimization range
+    def tune(self, parameter, bounds, steps=20, mode='cumulative', seeds=1, search='grid', processes=1, cache=None, plot=True):
+        ''' Runs the block from a fresh copy of its pipeline for a range of
+            hyperparameter values and scores each run. See pipeline.tuning.
+            Args:
+                parameter (str or dict): the parameter to optimize, or a dict
+                                         mapping several parameters to bounds
+                bounds (tuple): optimization range, if a single parameter is passed
+                steps (int): points per parameter for grid search, or total samples for random search
                 mode (str): 'iterations': optimize the number of iterations for convergence
                             'result': optimize the final result
                             'improvement': optimize the improvement per iteration
+                            'cumulative': optimize the sum of all costs
+                seeds (int): number of random seeds run for each configuration
+                search (str): 'grid' or 'random'
+                processes (int): worker processes used to run configurations concurrently
+                cache (str): path to a JSON file memoizing completed runs
+                plot (bool): whether to plot the seed-averaged metric against a single parameter
+
+            Returns:
+                pandas.DataFrame: one row per (configuration, seed) run
         '''
-        from emergent.pipeline import Pipeline
+        from emergent.pipeline.tuning import tune
+        if isinstance(parameter, dict):
+            parameters = parameter
+        else:
+            parameters = {parameter: bounds}
+        results = tune(self, parameters, steps=steps, mode=mode, seeds=seeds,
+                       search=search, processes=processes, cache=cache)
 
-        meta_points = np.logspace(np.log10(bounds[0]),
-                                  np.log10(bounds[1]),
-                                  steps)
-        meta_costs = []
-        for point in meta_points:
-            pipe = Pipeline(self.pipeline.state,
-                            self.pipeline.scaler.limits,
-                            self.pipeline.experiment,
-                            verbose=False)
-            self.params[parameter].value = point
-            pipe.add(self)
-            points, costs = pipe.run()
-            if mode == 'iterations':
-                meta_costs.append(len(points))
-            elif mode == 'improvement':
-                meta_costs.append(-(costs[-1]-costs[0])/len(points))
-            elif mode == 'result':
-                meta_costs.append(-(costs[-1]-costs[0]))
-            elif mode == 'cumulative':
-                meta_costs.append(np.sum(costs))
+        if plot and len(parameters) == 1:
+            import matplotlib.pyplot as plt
+            name = list(parameters)[0]
+            summary = results.groupby(name)['metric'].mean()
+            plt.plot(summary.index, summary.values)
+            plt.xlabel(name)
+            labels = {'iterations': 'Iterations for convergence',
+                      'improvement': 'Improvement per iteration',
+                      'result': 'Final result',
+                      'cumulative': 'Cumulative cost'}
+            plt.ylabel(labels[mode])
+            b = parameters[name]
+            if b[0] > 0 and b[1]/b[0] > 100:
+                plt.xscale('log')
+            plt.show()
 
-        plt.plot(meta_points, meta_costs)
-        plt.xlabel(parameter)
-        labels = {'iterations': 'Iterations for convergence',
-                  'improvement': 'Improvement per iteration',
-                  'result': 'Final result',
-                  'cumulative': 'Cumulative cost'}
-        plt.ylabel(labels[mode])
-        if bounds[1]/bounds[0] > 100:
-            plt.xscale('log')
-        plt.show()
+        return results
 
     def plot(self):
         self.pipeline.plot()
@@ -6,7 +6,6 @@ class Fit(Block):
     def __init__(self):
         super().__init__()
 
-    def run(self, points, costs, bounds=None):
+    def run(self, history, bounds=None):
         ''' Retrain the model on passed data'''
-        self.pipeline.fit(points, costs)
-        return points, costs
+        self.pipeline.fit(history.points, history.costs)
@@ -14,15 +14,20 @@ class Loop(BasePipeline):
     def measure(self, point):
         return self.pipeline.measure(point)
 
-    def run(self, points, costs, bounds=None):
+    def measure_batch(self, points):
+        return self.pipeline.measure_batch(points)
+
+    @property
+    def batch(self):
+        return self.pipeline.batch
+
+    def run(self, history, bounds=None):
         self.bounds = self.pipeline.bounds
-        self.points = points.copy()
-        self.costs = costs.copy()
+        self.history = history
         for i in range(self.params['Loops'].value):
             for block in self.blocks:
-                self.points, self.costs = block.run(self.points, self.costs, self.bounds)
+                block.run(history, self.bounds)
                 self.pipeline.bounds = self.bounds # update parent bounds in case they changed
-        return self.points, self.costs
 
     def unnormalize(self, points):
         return self.pipeline.unnormalize(points)
@@ -1,3 +1,4 @@
+import numpy as np
 from emergent.pipeline import Block
 
 class Measure(Block):
@@ -5,8 +6,7 @@ class Measure(Block):
     def __init__(self, params={}):
         super().__init__()
 
-    def run(self, points, costs, bounds=None):
-        ''' Retrain the model on passed data'''
-        costs = np.append(costs, self.pipeline.measure(points[-1]))
-        points = np.append(points, np.atleast_2d(points[-1]), axis=0)
-        return points, costs
+    def run(self, history, bounds=None):
+        ''' Remeasure the last point '''
+        point = history.points[-1].copy()
+        history.append(point, self.pipeline.measure(point))
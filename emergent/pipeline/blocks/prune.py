@@ -9,11 +9,9 @@ class Prune(Block):
         for p in params:
             self.params[p].value = params[p]
 
-    def run(self, points, costs, bounds=None):
-        valid_points = points[costs<np.min(costs)*self.params['threshold'].value]
-        valid_costs = costs[costs<np.min(costs)*self.params['threshold'].value]
+    def run(self, history, bounds=None):
+        costs = history.costs
+        history.select(costs<np.min(costs)*self.params['threshold'].value)
 
-        return valid_points, valid_costs
-
-    def _run(self, points, costs, bounds=None):
-        return self.run(points, costs, bounds)
+    def _run(self, history, bounds=None):
+        self.run(history, bounds)
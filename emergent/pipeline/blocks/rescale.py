@@ -9,10 +9,10 @@ class Rescale(Block):
         for p in params:
             self.params[p].value = params[p]
 
-    def run(self, points, costs, bounds=None):
+    def run(self, history, bounds=None):
+        points, costs = history.points, history.costs
         valid_points = points[costs<np.min(costs)*self.params['Threshold'].value]
         new_bounds = []
         for i in range(points.shape[1]):
             new_bounds.append((valid_points[:,i].min(), valid_points[:,i].max()))
         self.pipeline.bounds = new_bounds
-        return points, costs
@@ -0,0 +1,71 @@
+''' The Budget class limits the resources spent by a Pipeline run: a maximum
+    number of evaluations, a maximum wall-clock time, and a target cost at which
+    the run is considered complete. The Pipeline checks its budget before every
+    measurement and raises BudgetExhausted when any limit is reached; Pipeline.run
+    catches the exception, so every block stops at its next measurement and the
+    points acquired so far are returned as usual. A batch which would overrun
+    the evaluation budget is truncated to the evaluations remaining, so the limit
+    is never exceeded. '''
+import time
+
+class BudgetExhausted(Exception):
+    ''' Raised by a Pipeline when its budget does not allow a measurement. Any
+        points of a batch which were measured before the budget ran out are
+        attached so that they can be recorded. '''
+    def __init__(self, reason, points=None, costs=None):
+        super().__init__(reason)
+        self.points = points
+        self.costs = costs
+
+class Budget():
+    def __init__(self, evaluations=None, seconds=None, target=None):
+        ''' Args:
+                evaluations (int): maximum number of measurements
+                seconds (float): maximum duration of the run
+                target (float): cost at or below which the run stops
+        '''
+        self.evaluations = evaluations
+        self.seconds = seconds
+        self.target = target
+        self.start()
+
+    @classmethod
+    def from_dict(cls, d):
+        ''' Creates a Budget from a dict with any of the keys 'evaluations',
+            'seconds' and 'target'; missing or None values are unlimited. '''
+        return cls(**{k: d[k] for k in ['evaluations', 'seconds', 'target'] if d.get(k) is not None})
+
+    def to_dict(self):
+        return {'evaluations': self.evaluations, 'seconds': self.seconds, 'target': self.target}
+
+    def start(self, best=None):
+        ''' Resets the counters at the start of a run.
+            Args:
+                best (float): best cost already known, e.g. of the initial state
+        '''
+        self.count = 0
+        self.best = best
+        self.start_time = time.time()
+
+    @property
+    def remaining(self):
+        ''' Number of evaluations left, or None if unlimited. '''
+        if self.evaluations is None:
+            return None
+        return max(self.evaluations - self.count, 0)
+
+    def check(self, n=1):
+        ''' Raises BudgetExhausted if n more evaluations are not allowed. '''
+        if self.evaluations is not None and self.count + n > self.evaluations:
+            raise BudgetExhausted('evaluation limit of %i reached'%self.evaluations)
+        if self.seconds is not None and time.time() - self.start_time >= self.seconds:
+            raise BudgetExhausted('time limit of %gs reached'%self.seconds)
+        if self.target is not None and self.best is not None and self.best <= self.target:
+            raise BudgetExhausted('target cost of %g reached'%self.target)
+
+    def record(self, costs):
+        ''' Counts completed evaluations and tracks the best cost. '''
+        for c in costs:
+            self.count += 1
+            if self.best is None or c < self.best:
+                self.best = c
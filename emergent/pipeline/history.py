@@ -0,0 +1,100 @@
+''' The History class stores the normalized points and costs acquired by a Pipeline.
+    Storage is preallocated and grown by doubling, so that appending N samples
+    costs O(N) in total rather than the O(N^2) copying incurred by repeated calls
+    to np.append. The points and costs properties return views into the buffer,
+    so blocks should copy any row they intend to modify in place.
+
+    If a RunLog is attached as the log attribute, every sample is also streamed
+    to it as a row of (time, cost, *point). Samples discarded by select() remain
+    in the log. '''
+import time
+import numpy as np
+
+class History():
+    def __init__(self, dim, capacity=64):
+        ''' Args:
+                dim (int): dimension of the normalized parameter space
+                capacity (int): number of samples to preallocate storage for
+        '''
+        self.dim = dim
+        self.length = 0
+        self._points = np.empty((max(capacity, 1), dim))
+        self._costs = np.empty(max(capacity, 1))
+        self.start_indices = []
+        self.end_indices = []
+        self.log = None
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def points(self):
+        ''' A view of all points acquired so far. '''
+        return self._points[:self.length]
+
+    @property
+    def costs(self):
+        ''' A view of all costs acquired so far. '''
+        return self._costs[:self.length]
+
+    def snapshot(self):
+        ''' Returns copies of the points and costs acquired so far, of equal
+            length even if another thread is appending. '''
+        n = self.length
+        points, costs = self._points, self._costs
+        return points[:n].copy(), costs[:n].copy()
+
+    def reserve(self, capacity):
+        ''' Grows the buffers (by at least a factor of two) to hold the target
+            number of samples. '''
+        if capacity <= len(self._costs):
+            return
+        capacity = max(capacity, 2*len(self._costs))
+        points = np.empty((capacity, self.dim))
+        costs = np.empty(capacity)
+        points[:self.length] = self.points
+        costs[:self.length] = self.costs
+        self._points = points
+        self._costs = costs
+
+    def append(self, point, cost):
+        ''' Adds a single point and its cost. '''
+        self.reserve(self.length+1)
+        self._points[self.length] = point
+        self._costs[self.length] = cost
+        self.length += 1
+        if self.log is not None:
+            self.log.append(np.concatenate([[time.time(), cost], point]))
+
+    def extend(self, points, costs):
+        ''' Adds an array of points and their costs. '''
+        points = np.atleast_2d(points)
+        costs = np.atleast_1d(costs)
+        n = len(costs)
+        self.reserve(self.length+n)
+        self._points[self.length:self.length+n] = points
+        self._costs[self.length:self.length+n] = costs
+        self.length += n
+        if self.log is not None:
+            rows = np.column_stack([np.full(n, time.time()), costs, points])
+            self.log.extend(rows)
+
+    def select(self, mask):
+        ''' Discards all samples not matching the passed boolean mask. '''
+        points = self.points[mask]
+        costs = self.costs[mask]
+        self.length = len(costs)
+        self._points[:self.length] = points
+        self._costs[:self.length] = costs
+
+    def best(self):
+        ''' Returns a copy of the lowest-cost point and its cost. '''
+        i = np.argmin(self.costs)
+        return self.points[i].copy(), self.costs[i]
+
+    def span(self, index):
+        ''' Returns views of the points and costs acquired by the block run at
+            the passed index of the parent Pipeline. '''
+        start = self.start_indices[index]
+        end = self.end_indices[index]
+        return self.points[start:end], self.costs[start:end]
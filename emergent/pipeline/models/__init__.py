@@ -1,2 +1,3 @@
 from .gaussian_process import GaussianProcess
 from .gaussian_dev import GaussianModel
+from .sparse_gaussian_process import SparseGaussianProcess
@@ -1,4 +1,3 @@
-from scipy.optimize import curve_fit
 import numpy as np
 from emergent.pipeline.models.model import Model
 
@@ -24,6 +23,7 @@ class GaussianModel(Model):
     def fit(self, points, costs):
         N = points.shape[1]
         p0 = tuple([0.5]*(2*N+1))
+        from scipy.optimize import curve_fit
         self.popt, self.pcov = curve_fit(self.gaussian, points, costs, p0)
 
     def predict(self, X):
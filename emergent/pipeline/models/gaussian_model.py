@@ -7,7 +7,7 @@ from scipy.optimize import minimize
 from emergent.pipeline.plotting import plot_1D, plot_2D
 
 from scipy.optimize import curve_fit
-from emergent.pipeline import Block
+from emergent.pipeline import Block, History
 import matplotlib.pyplot as plt
 
 class GaussianModel(Block):
@@ -48,23 +48,20 @@ class GaussianModel(Block):
         print('measure model')
         return self.predict(X)[0][0]
 
-    def run(self, points, costs, bounds=None):
+    def run(self, history, bounds=None):
         ''' Trains on the passed data, numerically optimizes the modeled response
             surface, then makes a physical measurement at the modeled minimum. '''
-        self.fit(points, costs)
+        self.fit(history.points, history.costs)
         # if hasattr(self, 'optimizer'):
-        x_pred, y_pred = self.optimizer.run(points.copy(), costs.copy(), bounds)
-        x_pred = x_pred[len(points)::]
-        y_pred = y_pred[len(costs)::]
-        point = x_pred[np.argmin(y_pred)]
-        self.best_point, best_cost = point, np.array([self.pipeline.measure(point)])
+        predictions = History(history.dim)
+        predictions.extend(history.points, history.costs)
+        self.optimizer.run(predictions, bounds)
+        x_pred = predictions.points[len(history)::]
+        y_pred = predictions.costs[len(history)::]
+        self.best_point = x_pred[np.argmin(y_pred)].copy()
         # else:
         #     self.best_point = np.array([self.popt[1], self.popt[2]])
-        #     best_cost = np.array([self.pipeline.measure(self.best_point)])
-        points = np.append(points, np.atleast_2d(self.best_point), axis=0)
-        costs = np.append(costs, best_cost)
-
-        return points, costs
+        history.append(self.best_point, self.pipeline.measure(self.best_point))
 
     def list_optimizers(self):
         import importlib, inspect
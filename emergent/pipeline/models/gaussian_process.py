@@ -1,8 +1,6 @@
 from emergent.utilities.containers import Parameter
 from emergent.utilities.decorators import algorithm
 import numpy as np
-from sklearn.gaussian_process import GaussianProcessRegressor
-from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C, WhiteKernel
 import pickle
 from emergent.pipeline.models.model import Model
 import logging as log
@@ -10,7 +8,6 @@ import logging as log
 class GaussianProcess(Model):
     def __init__(self, params={}):
         super().__init__()
-        self.params = {}
         self.params['Amplitude'] = Parameter(name= 'Kernel amplitude',
                                             value = 1,
                                             min = 0,
@@ -26,14 +23,30 @@ class GaussianProcess(Model):
                                             min = 0,
                                             max = 10,
                                             description = 'Amplitude of modeled white noise process')
+        self.params['Refit interval'] = Parameter(name= 'Refit interval',
+                                            value = 10,
+                                            type = int,
+                                            min = 1,
+                                            description = 'New points between kernel re-optimizations')
+        self.params['Drift tolerance'] = Parameter(name= 'Drift tolerance',
+                                            value = 0.5,
+                                            min = 0,
+                                            description = 'Change in log-likelihood per point which triggers kernel re-optimization')
 
         for p in params:
             self.params[p].value = params[p]
 
+        from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C, WhiteKernel
+        from emergent.utilities.regression import IncrementalGaussianProcess
         kernel = C(self.params['Amplitude'].value, (1e-3, 1e3)) * RBF(self.params['Length scale'].value, (1e-2, 1e2)) + WhiteKernel(self.params['Noise'].value)
-        self.model = GaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=10)
+        self.model = IncrementalGaussianProcess(kernel=kernel,
+                                                refit_interval=self.params['Refit interval'].value,
+                                                drift_tolerance=self.params['Drift tolerance'].value,
+                                                restarts=10)
 
     def fit(self, points, costs):
+        self.model.refit_interval = self.params['Refit interval'].value
+        self.model.drift_tolerance = self.params['Drift tolerance'].value
         self.model.fit(points, costs)
 
     def predict(self, X):
@@ -1,9 +1,7 @@
 from abc import abstractmethod
-from emergent.pipeline import BasePipeline
+from emergent.pipeline import BasePipeline, History
+from emergent.utilities.containers import Parameter
 import numpy as np
-import pyqtgraph as pg
-pg.setConfigOption('background', 'w')
-pg.setConfigOption('foreground', 'k')
 
 class Model(BasePipeline):
     ''' The Model class inherits elements from both Pipeline and Block - it is a subpipeline
@@ -11,10 +9,24 @@ class Model(BasePipeline):
         numerically optimize the surface to inform future sampling choices, then make a physical
         measurement at the optimized point.
 
+        If the parent Pipeline is asynchronous, the physical measurement is left
+        in flight while the next candidate is computed. The pending point is
+        included in the fit with a fantasized cost chosen by the Liar parameter:
+        'predicted' uses the model's prediction at the point (kriging believer),
+        while 'min', 'mean' and 'max' use a constant lie based on the observed
+        costs.
         '''
+    batch = True
+
     def __init__(self):
         super().__init__()
-
+        self.params = {}
+        self.params['Liar'] = Parameter(name='Liar',
+                                        value='predicted',
+                                        type=str,
+                                        options=['predicted', 'min', 'mean', 'max'],
+                                        description='Fantasized cost of a pending measurement in asynchronous mode')
+        self.pending = None
 
     @abstractmethod
     def measure(self, X):
@@ -22,30 +34,52 @@ class Model(BasePipeline):
             for each given model. '''
         return
 
+    def measure_batch(self, X):
+        ''' Returns the model's prediction of the cost surface at each row of X. '''
+        return self.predict(np.atleast_2d(X))[0]
+
     @abstractmethod
     def fit(self, points, costs):
         '''Trains the model on the passed data. Reimplement for a given model. '''
         return
 
-    def run(self, points, costs, bounds=None):
+    def run(self, history, bounds=None):
         ''' Trains on the passed data, numerically optimizes the modeled response
             surface according to the added blocks, then makes a physical measurement
             at the modeled minimum. '''
-        # _points = points.copy()
-        # _costs = costs.copy()
+        points, costs = history.points, history.costs
+        if self.pending is not None:
+            point = self.pending[0]
+            points = np.append(points, np.atleast_2d(point), axis=0)
+            costs = np.append(costs, self.lie(point, history.costs))
         self.fit(points, costs)
-        self.points = np.atleast_2d(points[-1].copy())
-        self.costs = costs[-1].copy()
+        self.history = History(history.dim)      # modeled points and costs
+        self.history.append(points[-1], costs[-1])
         for block in self.blocks:
-            self.points, self.costs = block.run(self.points, self.costs)
+            block.run(self.history)
 
         ## make physical measurement
-        self.best_point = self.points[np.argmin(self.costs)]
-        best_cost = np.array([self.pipeline.measure(self.best_point)])
+        self.synchronize()
+        self.best_point = self.history.best()[0]
+        self.target = history
+        self.pending = (self.best_point, self.submit(self.best_point))
+        if self.pending[1].done():
+            self.synchronize()
+
+    def lie(self, point, costs):
+        ''' Returns a fantasized cost for a pending measurement at a point. '''
+        liar = self.params['Liar'].value
+        if liar == 'predicted':
+            return self.predict(np.atleast_2d(point))[0][0]
+        return {'min': np.min, 'mean': np.mean, 'max': np.max}[liar](costs)
 
-        points = np.append(points, np.atleast_2d(self.best_point), axis=0)
-        costs = np.append(costs, best_cost)
-        return points, costs
+    def synchronize(self):
+        ''' Waits for the measurement in flight, if any, and records it. '''
+        if self.pending is None:
+            return
+        point, future = self.pending
+        self.pending = None
+        self.target.append(point, future.result())
 
     def plot(self, axis):
         ''' Plots a 1D cross-section through the minimum of the modeled surface. '''
@@ -59,6 +93,9 @@ class Model(BasePipeline):
                                       self.pipeline.bounds[axis][1],
                                       n_points)
         costs = self.predict(points)[0]
+        import pyqtgraph as pg
+        pg.setConfigOption('background', 'w')
+        pg.setConfigOption('foreground', 'k')
         win = pg.GraphicsWindow()
         win.setWindowTitle('Modeled surface')
         label = pg.LabelItem(justify = "right")
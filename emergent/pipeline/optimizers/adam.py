@@ -1,8 +1,8 @@
 from emergent.utilities.containers import Parameter
 from emergent.utilities.decorators import algorithm
 import numpy as np
-import matplotlib.pyplot as plt
 from emergent.pipeline import Block
+from emergent.pipeline.optimizers.gradient import estimate_gradient
 import logging as log
 
 class Adam(Block):
@@ -33,42 +33,41 @@ class Adam(Block):
         self.params['Noise'] = Parameter(name= 'Noise',
                                             value = 0,
                                             description = 'Noise injection for stochastic optimization')
+        self.params['Gradient'] = Parameter(name = 'Gradient',
+                                            value = 'central',
+                                            type = str,
+                                            options = ['central', 'spsa'],
+                                            description = 'Gradient estimator: central differences (2*dim shots) or SPSA (2 shots per perturbation)')
+        self.params['Perturbations'] = Parameter(name = 'Perturbations',
+                                            value = 1,
+                                            type = int,
+                                            min = 1,
+                                            description = 'Number of averaged SPSA perturbations per gradient estimate')
         for p in params:
             self.params[p].value = params[p]
         super().__init__(state, bounds, cost, substate)
 
-    def gradient(self, points, costs):
-        point = points[-1]
-        dim = points.shape[1]
-        g = np.zeros(dim)
-        for d in range(dim):
-            step = np.zeros(dim)
-            step[d] = self.params['Dither size'].value
+    def gradient(self, history):
+        ''' Estimates the gradient at the last point, measuring all dithered
+            points in one batch. '''
+        return estimate_gradient(self.pipeline,
+                                 history,
+                                 self.params['Dither size'].value,
+                                 mode=self.params['Gradient'].value,
+                                 perturbations=self.params['Perturbations'].value)
 
-            p1 = point + step
-            p2 = point - step
-            c1 = self.pipeline.measure(p1)
-            c2 = self.pipeline.measure(p2)
-            g[d] = (c1-c2)/(2*step[d])
-
-            for p in [p1, p2]:
-                points = np.append(points, np.atleast_2d(p), axis=0)
-            for c in [c1, c2]:
-                costs = np.append(costs, c)
-        return g, points, costs
-
-    def run(self, points, costs, bounds=None):
+    def run(self, history, bounds=None):
         # if bounds is not None:
             # log.warn('Adam optimizer does not support bounds!')
-        dim = points.shape[1]
+        dim = history.dim
         m = np.zeros(dim)
         v = np.zeros(dim)
         epsilon = 1e-8
         gradients = []
         while True:
             ''' compute gradient '''
-            x_i = points[-1]
-            g, points, costs = self.gradient(points, costs)
+            x_i = history.points[-1].copy()
+            g = self.gradient(history)
             gradients.append(g)
             gmag = np.dot(g,g)
             max_gmag = np.dot(np.max(gradients), np.max(gradients))
@@ -83,8 +82,4 @@ class Adam(Block):
 
             ''' move along gradient '''
             x_i -= self.params['Learning rate'].value*mhat/(np.sqrt(vhat)+epsilon)+np.random.normal(0, self.params['Noise'].value, size=dim)
-            points = np.append(points, np.atleast_2d(x_i), axis=0)
-            costs = np.append(costs, self.pipeline.measure(x_i))
-        self.points = self.pipeline.unnormalize(points)
-        self.costs = costs
-        return points, costs
+            history.append(x_i, self.pipeline.measure(x_i))
@@ -1,17 +1,32 @@
 from emergent.utilities.containers import Parameter
 import numpy as np
-from scipy.optimize import differential_evolution
 import itertools
+import os
+import json
+import logging as log
+import time
 from emergent.pipeline import Block
 
 class DifferentialEvolution(Block):
+    ''' Differential evolution with the best1bin strategy. The population and its
+        costs are kept in preallocated arrays. With deferred updating, every trial
+        vector of a generation is built from the previous generation and the
+        whole generation is measured as one batch; with immediate updating, each
+        trial is measured and selected in turn, as in scipy's default. The search
+        stops on convergence, after a number of generations, or when an
+        evaluation or wall-clock budget is spent. If a checkpoint file is given,
+        the population is saved after every generation and a later run resumes
+        from it if it was saved with the same population size, dimension, bounds
+        and mutation settings; the file is removed once the search converges or
+        reaches the generation limit. As in scipy, the best member is finally
+        polished with L-BFGS-B unless Polish is disabled. '''
     def __init__(self, params={}, state=None, bounds=None, cost=None, substate=None):
         super().__init__()
         self.params = {}
         self.params['Population'] = Parameter(name= 'Population',
                                             value = 20,
                                             type = int,
-                                            description = 'Initial population size')
+                                            description = 'Population size per dimension')
         self.params['Tolerance'] = Parameter(name= 'Tolerance',
                                             value = 0.01,
                                             description = 'Convergence criterion')
@@ -25,37 +40,185 @@ class DifferentialEvolution(Block):
                                             min = 0,
                                             max = 1,
                                             description = 'Crossover probability. Increasing this value allows a larger number of mutants to progress into the next generation, but at the risk of population stability.')
+        self.params['Generations'] = Parameter(name= 'Generations',
+                                            value = 1000,
+                                            type = int,
+                                            min = 1,
+                                            description = 'Maximum number of generations')
+        self.params['Updating'] = Parameter(name= 'Updating',
+                                            value = 'auto',
+                                            type = str,
+                                            options = ['auto', 'deferred', 'immediate'],
+                                            description = 'Deferred updating measures each generation as one batch; auto selects it for batched experiments.')
+        self.params['Max evaluations'] = Parameter(name= 'Max evaluations',
+                                            value = 0,
+                                            type = int,
+                                            min = 0,
+                                            description = 'Evaluation budget; 0 disables')
+        self.params['Max time'] = Parameter(name= 'Max time',
+                                            value = 0,
+                                            min = 0,
+                                            description = 'Wall-clock budget in seconds; 0 disables')
+        self.params['Polish'] = Parameter(name= 'Polish',
+                                            value = 1,
+                                            type = int,
+                                            min = 0,
+                                            max = 1,
+                                            description = 'Refine the best member with L-BFGS-B after the search (1) or not (0)')
+        self.params['Checkpoint'] = Parameter(name= 'Checkpoint',
+                                            value = '',
+                                            type = str,
+                                            description = 'File to save the population to after each generation and resume from; empty disables')
         for p in params:
             self.params[p].value = params[p]
         super().__init__(state, bounds, cost, substate)
-    def _measure(self, point):
-        ''' Intermediate cost function only used to store the points and costs
-            obtained by the differential evolution routine. '''
-        if self.measured_points is None:
-            self.measured_points = np.atleast_2d(point)
-        else:
-            self.measured_points = np.append(self.measured_points, np.atleast_2d(point), axis=0)
-        c = self.pipeline.measure(point)
-        self.measured_costs = np.append(self.measured_costs, c)
-
-        return c
-
-    def run(self, points, costs, bounds=None):
-        ''' Differential evolution algorithm from scipy.optimize. '''
+
+    def initialize(self, size, dim):
+        ''' Returns a Latin hypercube sample of the unit hypercube. '''
+        segments = (np.random.uniform(size=(size, dim)) + np.arange(size)[:, None]) / size
+        for d in range(dim):
+            segments[:, d] = segments[np.random.permutation(size), d]
+        return segments
+
+    def save(self, filename):
+        ''' Saves the current population and costs (in unit-hypercube coordinates)
+            along with the settings of the search. '''
+        with open(filename, 'wb') as file:
+            np.savez(file, population=self.population, energies=self.energies, generation=self.generation,
+                     settings=json.dumps(self.settings, sort_keys=True))
+
+    def load(self, filename):
+        ''' Loads a population saved with save() and returns True, or returns
+            False if it was saved with different settings. '''
+        with np.load(filename) as data:
+            if 'settings' not in data or str(data['settings']) != json.dumps(self.settings, sort_keys=True):
+                log.warning('Ignoring checkpoint %s saved with different settings or bounds.', filename)
+                return False
+            self.population = data['population'].copy()
+            self.energies = data['energies'].copy()
+            self.generation = int(data['generation'])
+        return True
+
+    def mutate(self, candidates, best):
+        ''' Forms best1bin trial vectors for the passed population indices. '''
+        size, dim = self.population.shape
+        n = len(candidates)
+
+        ''' Choose two distinct donors for each candidate, excluding the candidate itself '''
+        keys = np.random.uniform(size=(n, size))
+        keys[np.arange(n), candidates] = np.inf
+        donors = np.argpartition(keys, 2, axis=1)[:, :2]
+        mutants = self.population[best] + self.params['Mutation'].value*(self.population[donors[:, 0]]-self.population[donors[:, 1]])
+
+        crossovers = np.random.uniform(size=(n, dim)) < self.params['Recombination'].value
+        crossovers[np.arange(n), np.random.randint(dim, size=n)] = True
+        trials = np.where(crossovers, mutants, self.population[candidates])
+
+        ''' Replace out-of-range parameters with random values '''
+        out = (trials < 0) | (trials > 1)
+        trials[out] = np.random.uniform(size=out.sum())
+        return trials
+
+    def run(self, history, bounds=None):
+        ''' Differential evolution algorithm. '''
         if bounds is None:
-            bounds = np.array(list(itertools.repeat([0, 1], points.shape[1])))
-
-        self.measured_points = None
-        self.measured_costs = np.array([])
-        res = differential_evolution(func=self._measure,
-                   bounds=bounds,
-                   strategy='best1bin',
-                   tol = self.params['Tolerance'].value,
-                   mutation = self.params['Mutation'].value,
-                   recombination = self.params['Recombination'].value,
-                   popsize = self.params['Population'].value)
-
-        points = np.append(points, self.measured_points, axis=0)
-        self.costs = np.append(costs, self.measured_costs, axis=0)
-        self.points = self.pipeline.unnormalize(points)
-        return points, self.costs
+            bounds = np.array(list(itertools.repeat([0, 1], history.dim)))
+        bounds = np.array(bounds, dtype=float)
+        lower, span = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+        def scale(x):
+            return lower + x*span
+
+        updating = self.params['Updating'].value
+        if updating == 'auto':
+            updating = 'deferred' if self.pipeline.batch else 'immediate'
+        max_evaluations = self.params['Max evaluations'].value
+        max_time = self.params['Max time'].value
+        checkpoint = self.params['Checkpoint'].value
+        start_time = time.time()
+        start_length = len(history)
+        def exhausted():
+            if max_evaluations and len(history) - start_length >= max_evaluations:
+                return True
+            if max_time and time.time() - start_time >= max_time:
+                return True
+            return False
+
+        ''' Initialize or resume the population '''
+        size = max(5, self.params['Population'].value * history.dim)
+        self.settings = {'size': size,
+                         'dim': history.dim,
+                         'bounds': bounds.tolist(),
+                         'strategy': 'best1bin',
+                         'mutation': self.params['Mutation'].value,
+                         'recombination': self.params['Recombination'].value}
+        if not (checkpoint != '' and os.path.exists(checkpoint) and self.load(checkpoint)):
+            self.population = self.initialize(size, history.dim)
+            self.energies = np.full(size, np.inf)
+            self.generation = 0
+        unmeasured = np.where(np.isinf(self.energies))[0]
+        if max_evaluations:
+            unmeasured = unmeasured[:max_evaluations]
+        if len(unmeasured) > 0:
+            self.energies[unmeasured] = self.evaluate(self.population[unmeasured], scale, history)
+            if checkpoint != '':
+                self.save(checkpoint)
+
+        while self.generation < self.params['Generations'].value and not exhausted():
+            best = np.argmin(self.energies)
+            if updating == 'deferred':
+                candidates = np.arange(len(self.population))
+                if max_evaluations:
+                    candidates = candidates[:max_evaluations - (len(history) - start_length)]
+                trials = self.mutate(candidates, best)
+                energies = self.pipeline.measure_batch(scale(trials))
+                history.extend(scale(trials), energies)
+                improved = energies < self.energies[candidates]
+                self.population[candidates[improved]] = trials[improved]
+                self.energies[candidates[improved]] = energies[improved]
+            else:
+                for i in range(len(self.population)):
+                    trial = self.mutate([i], best)[0]
+                    energy = self.pipeline.measure(scale(trial))
+                    history.append(scale(trial), energy)
+                    if energy < self.energies[i]:
+                        self.population[i] = trial
+                        self.energies[i] = energy
+                        if energy < self.energies[best]:
+                            best = i
+                    if exhausted():
+                        break
+            self.generation += 1
+            if checkpoint != '':
+                self.save(checkpoint)
+
+            if np.std(self.energies) <= self.params['Tolerance'].value * np.abs(np.mean(self.energies)):
+                break
+
+        if checkpoint != '' and os.path.exists(checkpoint) and not exhausted():
+            os.remove(checkpoint)
+        best = self.population[np.argmin(self.energies)]
+        if self.params['Polish'].value and not exhausted():
+            best = self.polish(best, scale, history, max_evaluations - (len(history) - start_length) if max_evaluations else None)
+        best_point = scale(best)
+        history.append(best_point, self.pipeline.measure(best_point))
+
+    def polish(self, x0, scale, history, max_evaluations=None):
+        ''' Refines a unit-hypercube point with L-BFGS-B and returns the better
+            of the two. '''
+        from scipy.optimize import minimize
+        def cost(x):
+            energy = self.pipeline.measure(scale(x))
+            history.append(scale(x), energy)
+            return energy
+        options = {} if max_evaluations is None else {'maxfun': max(max_evaluations, 1)}
+        res = minimize(cost, x0, method='L-BFGS-B', bounds=[(0, 1)]*len(x0), options=options)
+        if res.fun < np.min(self.energies):
+            return res.x
+        return x0
+
+    def evaluate(self, trials, scale, history):
+        ''' Measures the passed unit-hypercube points. '''
+        points = scale(trials)
+        energies = self.pipeline.measure_batch(points)
+        history.extend(points, energies)
+        return energies
@@ -0,0 +1,39 @@
+''' Gradient estimators shared by the gradient-based optimizer blocks. Both
+    estimators measure all of their dithered points in a single batch.
+
+    * 'central': central finite differences along each axis, costing 2*dim
+      measurements per estimate.
+    * 'spsa': simultaneous perturbation stochastic approximation, which dithers
+      every axis at once along a random +/-1 direction, costing two measurements
+      per perturbation regardless of dimension. Averaging over several
+      perturbations reduces the variance of the estimate in noisy experiments.
+'''
+import numpy as np
+
+def estimate_gradient(pipeline, history, step, mode='central', perturbations=1):
+    ''' Estimates the gradient at the last point of the history and records
+        the dithered points.
+        Args:
+            pipeline (BasePipeline): the pipeline used to make measurements
+            history (History): the history whose last point is differentiated
+            step (float): dither size
+            mode (str): 'central' or 'spsa'
+            perturbations (int): number of averaged perturbations in 'spsa' mode
+    '''
+    point = history.points[-1].copy()
+    dim = history.dim
+    if mode == 'central':
+        directions = np.eye(dim)
+    elif mode == 'spsa':
+        directions = np.random.choice([-1, 1], size=(perturbations, dim))
+    else:
+        raise ValueError('Gradient mode must be "central" or "spsa".')
+    n = len(directions)
+    dithered = np.append(point + step*directions, point - step*directions, axis=0)
+    c = pipeline.measure_batch(dithered)
+    history.extend(dithered, c)
+
+    slopes = (c[:n]-c[n:])/(2*step)
+    if mode == 'central':
+        return slopes
+    return np.mean(slopes[:, None]*directions, axis=0)
@@ -1,7 +1,7 @@
 from emergent.utilities.containers import Parameter
 import numpy as np
-from emergent.utilities.plotting import plot_2D
 from emergent.pipeline import Block
+from emergent.pipeline.optimizers.gradient import estimate_gradient
 import logging as log
 
 class GradientDescent(Block):
@@ -12,41 +12,36 @@ class GradientDescent(Block):
         self.params['Iterations'] = Parameter(name = 'Iterations', type=int, value = 10)
         self.params['Learning rate'] = Parameter(name = 'Learning rate', value = 1e-3)
         self.params['Dither size'] = Parameter(name = 'Dither size', value = 0.01)
+        self.params['Gradient'] = Parameter(name = 'Gradient',
+                                            value = 'central',
+                                            type = str,
+                                            options = ['central', 'spsa'],
+                                            description = 'Gradient estimator: central differences (2*dim shots) or SPSA (2 shots per perturbation)')
+        self.params['Perturbations'] = Parameter(name = 'Perturbations',
+                                            value = 1,
+                                            type = int,
+                                            min = 1,
+                                            description = 'Number of averaged SPSA perturbations per gradient estimate')
 
         for p in params:
             self.params[p].value = params[p]
         super().__init__(state, bounds, cost, substate)
-    def gradient(self, points, costs):
-        point = points[-1]
-        dim = points.shape[1]
-        g = np.zeros(dim)
-        for d in range(dim):
-            step = np.zeros(dim)
-            step[d] = self.params['Dither size'].value
+    def gradient(self, history):
+        ''' Estimates the gradient at the last point, measuring all dithered
+            points in one batch. '''
+        return estimate_gradient(self.pipeline,
+                                 history,
+                                 self.params['Dither size'].value,
+                                 mode=self.params['Gradient'].value,
+                                 perturbations=self.params['Perturbations'].value)
 
-            p1 = point + step
-            p2 = point - step
-            c1 = self.pipeline.measure(p1)
-            c2 = self.pipeline.measure(p2)
-            g[d] = (c1-c2)/(2*step[d])
-
-            for p in [p1, p2]:
-                points = np.append(points, np.atleast_2d(p), axis=0)
-            for c in [c1, c2]:
-                costs = np.append(costs, c)
-        return g, points, costs
-
-    def run(self, points, costs, bounds=None):
+    def run(self, history, bounds=None):
         ''' Performs a uniformly-spaced sampling of the cost function in the
             space spanned by the passed-in state dict. '''
         if bounds is not None:
             log.warn('GradientDescent optimizer does not support bounds!')
         for i in range(self.params['Iterations'].value):
-            x_i = points[-1]
-            gradient, points, costs = self.gradient(points, costs)
+            x_i = history.points[-1].copy()
+            gradient = self.gradient(history)
             x_i -= self.params['Learning rate'].value * gradient
-            points = np.append(points, np.atleast_2d(x_i), axis=0)
-            costs = np.append(costs, self.pipeline.measure(x_i))
-        self.points = self.pipeline.unnormalize(points)
-        self.costs = costs
-        return points, costs
+            history.append(x_i, self.pipeline.measure(x_i))
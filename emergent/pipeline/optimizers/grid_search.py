@@ -1,6 +1,8 @@
 from emergent.utilities.containers import Parameter
 import numpy as np
-from emergent.utilities.plotting import plot_2D
+import json
+import os
+import logging as log
 from emergent.pipeline import Block
 
 class GridSearch(Block):
@@ -15,38 +17,115 @@ class GridSearch(Block):
                                             value = 1,
                                             type = int,
                                             description = 'Number of sweeps to do')
+        self.params['Refinements'] = Parameter(name= 'Refinements',
+                                            value = 0,
+                                            type = int,
+                                            min = 0,
+                                            description = 'Number of finer grids centered on the best point after the first sweep')
+        self.params['Zoom'] = Parameter(name= 'Zoom',
+                                            value = 0.25,
+                                            min = 0.01,
+                                            max = 1,
+                                            description = 'Span of each refined grid relative to the previous grid')
+        self.params['Checkpoint'] = Parameter(name= 'Checkpoint',
+                                            value = '',
+                                            type = str,
+                                            description = 'File to save progress to after each row and resume from; empty disables')
         for p in params:
             self.params[p].value = params[p]
         super().__init__(state, bounds, cost, substate)
 
-    def run(self, points, costs, bounds=None):
+    def rows(self, lower, upper, start=0):
+        ''' Lazily generates the grid spanning the passed limits one row of
+            Steps points at a time, starting from a flat index. Yields the index
+            of the first point in each row along with the points. '''
+        steps = self.params['Steps'].value
+        dim = len(lower)
+        shape = (steps,)*dim
+        total = steps**dim
+        for j in range(start, total, steps):
+            index = np.unravel_index(np.arange(j, min(j+steps, total)), shape)
+            fraction = np.transpose(index) / max(steps-1, 1)
+            yield j, lower + fraction*(upper-lower)
+
+    def run(self, history, bounds=None):
         ''' Performs a uniformly-spaced sampling of the cost function in the
-            space spanned by the passed-in state dict. '''
-        dim = points.shape[1]
+            space spanned by the passed-in state dict. Grid points are generated
+            lazily and measured one row at a time. If Refinements is nonzero,
+            each subsequent grid is centered on the best point found so far,
+            with its span reduced by the Zoom factor. If a checkpoint file is
+            given, progress is saved after each row and an interrupted search
+            resumes after the last measured row; a checkpoint saved with
+            different settings or bounds is ignored. '''
+        dim = history.dim
+        if bounds is None:
+            bounds = [(0, 1)]*dim
+        bounds = np.array(bounds, dtype=float)
+        steps = self.params['Steps'].value
+        sweeps = self.params['Sweeps'].value
+        levels = self.params['Refinements'].value + 1
+        checkpoint = self.params['Checkpoint'].value
 
-        grid = []
-        for n in range(dim):
-            if bounds is None:
-                space = np.linspace(0, 1, self.params['Steps'].value)
+        settings = {'steps': steps,
+                    'sweeps': sweeps,
+                    'refinements': levels - 1,
+                    'zoom': self.params['Zoom'].value,
+                    'bounds': bounds.tolist()}
+        progress = {'settings': settings,
+                    'level': 0,
+                    'sweep': 0,
+                    'index': 0,
+                    'lower': list(bounds[:, 0]),
+                    'upper': list(bounds[:, 1]),
+                    'best_point': None,
+                    'best_cost': None}
+        if checkpoint != '' and os.path.exists(checkpoint):
+            with open(checkpoint, 'r') as file:
+                saved = json.load(file)
+            if saved.get('settings') == settings:
+                progress = saved
             else:
-                space = np.linspace(bounds[n][0], bounds[n][1], self.params['Steps'].value)
-            grid.append(space)
-        grid = np.array(grid)
-        grid_points = np.transpose(np.meshgrid(*[grid[n] for n in range(dim)])).reshape(-1, dim)
+                log.warning('Ignoring checkpoint %s saved with different settings or bounds.', checkpoint)
+
+        if levels == 1:
+            history.reserve(len(history) + sweeps*steps**dim + 1)
 
         ''' Actuate search '''
-        grid_costs = np.array([])
-        for i in range(self.params['Sweeps'].value):
-            for point in grid_points:
-                # if not self.sampler.callback():
-                #     return self.points[0:len(self.costs)], self.costs
-                c = self.pipeline.measure(point)
-                points = np.append(points, np.atleast_2d(point), axis=0)
-                costs = np.append(costs, c)
-
-        best_point = points[np.argmin(costs)]
-        _points = np.append(points, np.atleast_2d(best_point), axis=0)
-        self.costs = np.append(costs, self.pipeline.measure(_points[-1]))
-
-        self.points = self.pipeline.unnormalize(_points)
-        return _points, self.costs      # return normalized points
+        while progress['level'] < levels:
+            lower = np.array(progress['lower'])
+            upper = np.array(progress['upper'])
+            while progress['sweep'] < sweeps:
+                for j, row in self.rows(lower, upper, progress['index']):
+                    costs = self.pipeline.measure_batch(row)
+                    history.extend(row, costs)
+                    if progress['best_cost'] is None or costs.min() < progress['best_cost']:
+                        progress['best_point'] = list(row[np.argmin(costs)])
+                        progress['best_cost'] = float(costs.min())
+                    progress['index'] = j + len(row)
+                    self.save(progress, checkpoint)
+                progress['sweep'] += 1
+                progress['index'] = 0
+
+            ''' Zoom in around the best point '''
+            center = np.array(progress['best_point'])
+            span = (upper - lower) * self.params['Zoom'].value
+            lower = np.clip(center - span/2, bounds[:, 0], bounds[:, 1] - span)
+            progress['lower'] = list(lower)
+            progress['upper'] = list(lower + span)
+            progress['level'] += 1
+            progress['sweep'] = 0
+            self.save(progress, checkpoint)
+
+        if checkpoint != '' and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        best_point, best_cost = history.best()
+        if progress['best_cost'] is not None and progress['best_cost'] < best_cost:
+            best_point = np.array(progress['best_point'])     # found before resuming
+        history.append(best_point, self.pipeline.measure(best_point))
+
+    def save(self, progress, checkpoint):
+        ''' Writes the search progress to the checkpoint file, if any. '''
+        if checkpoint == '':
+            return
+        with open(checkpoint, 'w') as file:
+            json.dump(progress, file)
@@ -1,6 +1,5 @@
 from emergent.utilities.containers import Parameter
 import numpy as np
-from scipy.optimize import minimize
 import itertools
 from emergent.pipeline import Block
 
@@ -15,32 +14,23 @@ class LBFGSB(Block):
         for p in params:
             self.params[p].value = params[p]
         super().__init__(state, bounds, cost, substate)
-    def _measure(self, point):
+    def _measure(self, point, history):
         ''' Intermediate cost function only used to store the points and costs
             obtained by the differential evolution routine. '''
-        if self.measured_points is None:
-            self.measured_points = np.atleast_2d(point)
-        else:
-            self.measured_points = np.append(self.measured_points, np.atleast_2d(point), axis=0)
         c = self.pipeline.measure(point)
-        self.measured_costs = np.append(self.measured_costs, c)
+        history.append(point, c)
 
         return c
 
-    def run(self, points, costs, bounds=None):
+    def run(self, history, bounds=None):
         ''' L-BFGS-B algorithm from scipy.optimize. '''
         if bounds is None:
-            bounds = np.array(list(itertools.repeat([0, 1], points.shape[1])))
+            bounds = np.array(list(itertools.repeat([0, 1], history.dim)))
 
-        self.measured_points = None
-        self.measured_costs = np.array([])
+        from scipy.optimize import minimize
         res = minimize(fun=self._measure,
-                   x0=points[-1],
+                   x0=history.points[-1].copy(),
                    bounds=bounds,
+                   args=(history,),
                    method='L-BFGS-B',
                    tol = self.params['Tolerance'].value)
-
-        points = np.append(points, self.measured_points, axis=0)
-        self.costs = np.append(costs, self.measured_costs, axis=0)
-        self.points = self.pipeline.unnormalize(points)
-        return points, self.costs
@@ -13,54 +13,84 @@ class ParticleSwarm(Block):
         self.params['Inertia'] = Parameter(name= 'Inertia', value=1)
         self.params['Cognitive acceleration'] = Parameter(name= 'Cognitive acceleration', value=0.1)
         self.params['Social acceleration'] = Parameter(name= 'Social acceleration', value=0.1)
+        self.params['Boundary'] = Parameter(name= 'Boundary',
+                                            value='reflect',
+                                            type=str,
+                                            options=['reflect', 'clamp', 'none'],
+                                            description='Handling of particles leaving the bounds')
+        self.params['Patience'] = Parameter(name= 'Patience',
+                                            type=int,
+                                            value=0,
+                                            min=0,
+                                            description='Generations without improvement before stopping early; 0 disables')
+        self.params['Tolerance'] = Parameter(name= 'Tolerance',
+                                            value=0,
+                                            min=0,
+                                            description='Minimum decrease in the best cost counted as an improvement')
 
         for p in params:
             self.params[p].value = params[p]
         super().__init__(state, bounds, cost, substate)
 
-    def run(self, points, costs, bounds=None):
-        ''' Differential evolution algorithm from scipy.optimize. '''
+    def run(self, history, bounds=None):
+        ''' Particle swarm optimization. The positions and velocities of all
+            particles are updated with array operations and each generation is
+            evaluated as one batch. '''
         particles = self.params['Particles'].value
-        dim = points.shape[1]
+        dim = history.dim
         if bounds is None:
             bounds = np.array(list(itertools.repeat((0, 1), dim)))
-        pos = np.empty((particles, dim))
-        vel = np.empty((particles, dim))
-        swarm_best_point = [0,0]
-        swarm_best_cost = 999
-        for i in range(points.shape[1]):
-            pos[:,i] =  np.random.uniform(bounds[i][0], bounds[i][1], size=particles)
-            v = bounds[i][1] - bounds[i][0]
-            vel[:,i] =  np.random.uniform(-v, v, size=particles)
+        bounds = np.array(bounds, dtype=float)
+        lower, upper = bounds[:, 0], bounds[:, 1]
+
+        pos = np.random.uniform(lower, upper, size=(particles, dim))
+        vel = np.random.uniform(-(upper-lower), upper-lower, size=(particles, dim))
         vel *= self.params['Velocity scale'].value
         best_point = pos.copy()
-        best_cost = np.empty(particles)
-        for i in range(particles):
-            points = np.append(points, np.atleast_2d(pos[i,:]), axis=0)
-            costs = np.append(costs, self.pipeline.measure(points[-1]))
-            best_cost[i] = costs[-1]
-            if costs[-1] < swarm_best_cost:
-                swarm_best_point = points[-1]
-                swarm_best_cost = costs[-1]
+        best_cost = self.pipeline.measure_batch(pos)
+        history.extend(pos, best_cost)
+        swarm_best_point = pos[np.argmin(best_cost)].copy()
+        swarm_best_cost = best_cost.min()
 
+        stagnant = 0
         for s in range(self.params['Steps'].value):
-            for i in range(particles):
-                rp = np.random.uniform(size=dim)
-                rg = np.random.uniform(size=dim)
-                vel[i, :] = self.params['Inertia'].value*vel[i, :]
-                vel[i, :] += self.params['Cognitive acceleration'].value*rp*(best_point[i, :]-pos[i, :])
-                vel[i, :] += self.params['Social acceleration'].value*rg*(swarm_best_point[:]-pos[i, :])
-                pos[i, :] += vel[i, :]
-                points = np.append(points, np.atleast_2d(pos[i, :]), axis=0)
-                costs = np.append(costs, self.pipeline.measure(points[-1]))
-                if costs[-1] < best_cost[i]:
-                    best_point[i,:] = points[-1]
-                    best_cost[i] = costs[-1]
-                    if costs[-1] < swarm_best_cost:
-                        swarm_best_point = points[-1]
-                        swarm_best_cost = costs[-1]
+            ''' Move every particle, then evaluate the new generation as one batch '''
+            r = np.random.uniform(size=(particles, 2, dim))
+            vel *= self.params['Inertia'].value
+            vel += self.params['Cognitive acceleration'].value*r[:, 0]*(best_point-pos)
+            vel += self.params['Social acceleration'].value*r[:, 1]*(swarm_best_point-pos)
+            pos += vel
+            self.enforce_bounds(pos, vel, lower, upper)
+
+            c = self.pipeline.measure_batch(pos)
+            history.extend(pos, c)
+            improved = c < best_cost
+            best_point[improved] = pos[improved]
+            best_cost[improved] = c[improved]
+            if best_cost.min() < swarm_best_cost - self.params['Tolerance'].value:
+                stagnant = 0
+            else:
+                stagnant += 1
+            if best_cost.min() < swarm_best_cost:
+                swarm_best_point = best_point[np.argmin(best_cost)].copy()
+                swarm_best_cost = best_cost.min()
+            if 0 < self.params['Patience'].value <= stagnant:
+                break
+
+        history.append(swarm_best_point, self.pipeline.measure(swarm_best_point))
 
-        points = np.append(points, np.atleast_2d(swarm_best_point), axis=0)
-        self.costs = np.append(costs, self.pipeline.measure(points[-1]))
-        self.points = self.pipeline.unnormalize(points)
-        return points, self.costs
+    def enforce_bounds(self, pos, vel, lower, upper):
+        ''' Reflects particles off the bounds, reversing their velocity, or
+            clamps them to the bounds, stopping them; modifies pos and vel in place. '''
+        mode = self.params['Boundary'].value
+        if mode == 'none':
+            return
+        below = pos < lower
+        above = pos > upper
+        if mode == 'reflect':
+            pos[below] = (2*lower - pos)[below]
+            pos[above] = (2*upper - pos)[above]
+            vel[below | above] *= -1
+        else:
+            vel[below | above] = 0
+        np.clip(pos, lower, upper, out=pos)
@@ -1,18 +1,36 @@
 import numpy as np
 import importlib
 import inspect
-import matplotlib.pyplot as plt
 import time
 import json
-from emergent.pipeline import BasePipeline, Scaler
+from concurrent.futures import Future, ThreadPoolExecutor
+from emergent.pipeline import BasePipeline, Scaler, History, Budget, BudgetExhausted
+from emergent.utilities.runlog import RunLog
 
 import logging as log
 log.basicConfig(level=log.INFO)
 
 class Pipeline(BasePipeline):
-    def __init__(self, state, bounds, experiment, params=None, substate=None, verbose=True):
+    def __init__(self, state, bounds, experiment, params=None, substate=None, verbose=True, asynchronous=False, initial_cost=None, budget=None, log=None):
+        ''' Args:
+                asynchronous (bool): if True, Models compute their next candidate
+                                     while the previous measurement is in flight
+                initial_cost (float): cost of the initial state, if already known,
+                                      to avoid remeasuring it
+                budget (Budget or dict): limits on evaluations, seconds and target
+                                         cost for each run
+                log (str): directory of a RunLog to stream all samples to, as
+                           normalized points; block start and end indices
+                           are recorded as events
+        '''
         super().__init__()
         self.verbose = verbose
+        self.asynchronous = asynchronous
+        self.executor = None
+        if isinstance(budget, dict):
+            budget = Budget.from_dict(budget)
+        self.budget = None
+        self.exhausted = None
         self.experiment = experiment
         self.params = params
         self.state = state
@@ -22,8 +40,20 @@ class Pipeline(BasePipeline):
             self.substate = self.state
         self.scaler = Scaler(self.substate, bounds)
 
-        self._points = np.atleast_2d(self.scaler.state2array(self.scaler.normalize(self.substate)))     # normalized points
-        self.costs = np.array([self.measure(self.substate, norm=False)])
+        point = self.scaler.normalize_array(self.scaler.state2array(self.substate))
+        self.history = History(len(point))      # normalized points and costs
+        self.log = None
+        if log is not None:
+            self.log = RunLog(log, ['time', 'cost'] + [':'.join(path) for path in self.scaler.paths],
+                              metadata={'experiment': getattr(experiment, '__name__', type(experiment).__name__),
+                                        'state': state,
+                                        'limits': self.get_physical_bounds(),
+                                        'params': params})
+            self.history.log = self.log
+        if initial_cost is None:
+            initial_cost = self.measure(self.substate, norm=False)
+        self.history.append(point, initial_cost)
+        self.budget = budget
         self.points = self.unnormalize(self._points)
         self.bounds = []
         for d in range(self.points.shape[1]):
@@ -35,13 +65,17 @@ class Pipeline(BasePipeline):
             Args:
                 norm (bool): whether the passed state is normalized '''
         if type(state) is np.ndarray:
-            norm_target = self.scaler.array2state(state)
+            if norm:
+                state = self.scaler.unnormalize_array(state)
+            target = self.scaler.array2state(state)
+        elif norm:
+            target = self.scaler.unnormalize(state)
         else:
-            norm_target = state
-        if norm:
-            target = self.scaler.unnormalize(norm_target)
-        else:
-            target = norm_target
+            target = state
+        if self.budget is not None:
+            self.budget.check()
+        if self.batch:
+            return self._evaluate([self.fill(target)])[0]
         results = []
         for i in range(self.cycles_per_sample):
             if self.params is None:
@@ -52,8 +86,75 @@ class Pipeline(BasePipeline):
                 result = self.experiment(self.fill(target), self.params)
                 if result is not None:
                     results.append(result)
+        if self.budget is not None:
+            self.budget.record([np.mean(results)])
         return np.mean(results)
 
+    def measure_batch(self, points, norm=True):
+        ''' Evaluates the cost at each row of a 2D array of points. If the experiment
+            is tagged with the @batch decorator, all targets are passed to it in a
+            single call; otherwise the points are measured one at a time. Vectorized
+            experiments (see playground.Simulation) receive a single state whose
+            values are arrays rather than a list of states.
+            Args:
+                norm (bool): whether the passed points are normalized '''
+        points = np.atleast_2d(points)
+        if self.budget is not None:
+            self.budget.check()
+            remaining = self.budget.remaining
+            if remaining is not None and remaining < len(points):
+                costs = self.measure_batch(points[:remaining], norm=norm)
+                raise BudgetExhausted('evaluation limit of %i reached'%self.budget.evaluations, points[:remaining], costs)
+        if not self.batch:
+            costs = []
+            try:
+                for point in points:
+                    costs.append(self.measure(point, norm=norm))
+            except BudgetExhausted as e:
+                raise BudgetExhausted(str(e), points[:len(costs)], np.array(costs))
+            return np.array(costs)
+        if norm:
+            points = self.scaler.unnormalize_array(points)
+        if getattr(self.experiment, 'vectorized', False):
+            return self._evaluate(self.fill(self.scaler.array2state(points.T)))
+        targets = [self.fill(target) for target in self.scaler.array2states(points)]
+        return self._evaluate(targets)
+
+    def submit(self, point):
+        ''' Schedules a measurement at a normalized point and returns a Future
+            holding its cost. In asynchronous mode, measurements run one at a
+            time on a worker thread standing in for the apparatus; otherwise the
+            measurement is made immediately. '''
+        if not self.asynchronous:
+            future = Future()
+            future.set_result(self.measure(point))
+            return future
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        return self.executor.submit(self.measure, point)
+
+    def _evaluate(self, targets):
+        ''' Passes a list of full states (or a single stacked state for vectorized
+            experiments) to a batched experiment and returns the costs averaged
+            over cycles_per_sample. '''
+        results = []
+        for i in range(self.cycles_per_sample):
+            if self.params is None:
+                result = self.experiment(targets)
+            else:
+                result = self.experiment(targets, self.params)
+            if result is not None:
+                results.append(result)
+        costs = np.mean(np.atleast_2d(results), axis=0)
+        if self.budget is not None:
+            self.budget.record(costs)
+        return costs
+
+    @property
+    def batch(self):
+        ''' Whether the experiment accepts a list of states (see the @batch decorator). '''
+        return getattr(self.experiment, 'batch', False)
+
     def fill(self, substate):
         d = {}
         for key in self.state:
@@ -62,6 +163,16 @@ class Pipeline(BasePipeline):
             else:
                 d[key] = self.state[key]
         return d
+
+    @property
+    def _points(self):
+        ''' Normalized points acquired so far. '''
+        return self.history.points
+
+    @property
+    def costs(self):
+        return self.history.costs
+
     # def add_blocks(self, block_list):
     #     ''' Designed for compatibility with the PipelineLayout GUI element.
     #         Takes a list of dictionaries, each specifying a block and its params,
@@ -72,24 +183,46 @@ class Pipeline(BasePipeline):
     #         self.add(inst)
 
     def get_physical_bounds(self):
-        min_state = self.scaler.array2state(np.zeros(self._points.shape[1]))
-        max_state = self.scaler.array2state(np.ones(self._points.shape[1]))
-
-        min = self.scaler.state2array(self.scaler.unnormalize(min_state))
-        max = self.scaler.state2array(self.scaler.unnormalize(max_state))
-
-        return [(min[i],max[i]) for i in range(self._points.shape[1])]
+        return list(zip(self.scaler.min, self.scaler.max))
 
     def run(self):
-        self.start_indices = []
-        self.end_indices = []
+        self.start_indices = self.history.start_indices = []
+        self.end_indices = self.history.end_indices = []
         start_time = time.time()
-        for block in self.blocks:
-            self.start_indices.append(len(self.points))
-            self._points, self.costs = block.run(self._points, self.costs, self.bounds)
+        self.exhausted = None
+        if self.budget is not None:
+            self.budget.start(best=np.min(self.costs))
+        if self.log is not None:
+            self.log.update(blocks=self.to_json())
+        for i, block in enumerate(self.blocks):
+            self.start_indices.append(len(self.history))
+            if self.log is not None:
+                self.log.mark('start', block=i, name=block.__class__.__name__)
+            try:
+                block.run(self.history, self.bounds)
+                if hasattr(block, 'synchronize'):
+                    block.synchronize()
+            except BudgetExhausted as e:
+                self.exhausted = str(e)
+                if e.costs is not None and len(e.costs) > 0:
+                    self.history.extend(e.points, e.costs)
+                self.cancel(block)
             self.points = self.unnormalize(self._points)
-            self.end_indices.append(len(self.points))
+            self.end_indices.append(len(self.history))
+            if self.log is not None:
+                self.log.mark('end', block=i, name=block.__class__.__name__)
+            if self.exhausted is not None:
+                if self.verbose:
+                    log.info('Budget exhausted: %s.'%self.exhausted)
+                break
 
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.log is not None:
+            self.log.flush()
+            if self.exhausted is not None:
+                self.log.update(exhausted=self.exhausted)
         end_time = time.time()
         self.duration = end_time - start_time
         if self.verbose:
@@ -104,15 +237,19 @@ class Pipeline(BasePipeline):
 
         return self.points, self.costs
 
+    def cancel(self, block):
+        ''' Collects measurements still in flight after the budget is exhausted,
+            so that they are recorded in the history without further ones
+            being scheduled. '''
+        if not hasattr(block, 'synchronize'):
+            return
+        try:
+            block.synchronize()
+        except BudgetExhausted:
+            pass
+
     def unnormalize(self, points):
-        dim = points.shape[1]
-        _points = points.copy()
-        bounds = self.get_physical_bounds()
-        for d in range(dim):
-            min = bounds[d][0]
-            max = bounds[d][1]
-            _points[:, d] = min + points[:, d] *(max-min)
-        return _points
+        return self.scaler.unnormalize_array(points)
 
 
     def save(self, path, filename, pipeline=None):
@@ -139,6 +276,7 @@ class Pipeline(BasePipeline):
 
     def plot(self):
         from itertools import combinations
+        import matplotlib.pyplot as plt
         axes = list(range(self.points.shape[1]))
         combos = list(combinations(axes, 2))
 
@@ -1 +1,2 @@
 from emergent.pipeline.playground.functions import *
+from emergent.pipeline.playground.simulation import Simulation
@@ -18,7 +18,7 @@ def ackley(state, params):
     y = state['Y']
     result = -20*np.exp(-0.2*np.sqrt(0.5*(x**2+y**2)))
     result -= np.exp(0.5*(np.cos(2*np.pi*x)+np.cos(2*np.pi*y)))
-    result += e + 20
+    result += np.e + 20
     return result
 
 def rosenbrock(state, params):
@@ -0,0 +1,93 @@
+''' The Simulation class turns a cost function of the form f(state, params) into a
+    batched experiment for a Pipeline. Vectorized functions, such as the analytic
+    test functions in the playground, are evaluated on a whole population in a
+    single call: the states are stacked into one dict whose values are arrays,
+    so no per-point work is done. Expensive functions which cannot be vectorized
+    can instead be fanned out across a pool of worker processes.
+
+    Example:
+        pipe = Pipeline(state, bounds, Simulation(rosenbrock), params={})
+'''
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+def stack(states):
+    ''' Combines a list of (possibly nested) state dicts into a single dict whose
+        values are arrays, with one element per state. '''
+    stacked = {}
+    for key in states[0]:
+        if isinstance(states[0][key], dict):
+            stacked[key] = stack([state[key] for state in states])
+        else:
+            stacked[key] = np.array([state[key] for state in states])
+    return stacked
+
+class Simulation():
+    batch = True
+
+    def __init__(self, function, vectorized=True, processes=1, chunksize=1):
+        ''' Args:
+                function (callable): cost function with signature f(state, params)
+                vectorized (bool): whether the function accepts a state whose values are arrays
+                processes (int): worker processes used to evaluate non-vectorized functions
+                chunksize (int): number of states sent to a worker process at a time
+        '''
+        self.function = function
+        self.__name__ = getattr(function, '__name__', type(function).__name__)
+        self.vectorized = vectorized
+        self.processes = processes
+        self.chunksize = chunksize
+        self.executor = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
+
+    def __call__(self, states, params={}):
+        ''' Evaluates the function on a list of states, or on a single stacked
+            state whose values are arrays, and returns an array of costs. '''
+        if isinstance(states, dict):
+            n = len(np.atleast_1d(next(iter(self._leaves(states)))))
+            stacked = states
+        else:
+            n = len(states)
+            stacked = None
+        if self.vectorized:
+            if stacked is None:
+                stacked = stack(states)
+            return np.broadcast_to(self.function(stacked, params), (n,)).astype(float)
+        if stacked is not None:
+            states = self._unstack(stacked, n)
+        if self.processes > 1 and n > 1:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.processes)
+            costs = self.executor.map(self.function, states, [params]*n, chunksize=self.chunksize)
+        else:
+            costs = [self.function(state, params) for state in states]
+        return np.array(list(costs), dtype=float)
+
+    def close(self):
+        ''' Shuts down the worker pool, if any. '''
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def _leaves(self, state):
+        for value in state.values():
+            if isinstance(value, dict):
+                yield from self._leaves(value)
+            else:
+                yield value
+
+    def _unstack(self, stacked, n):
+        states = [{} for i in range(n)]
+        for key, value in stacked.items():
+            if isinstance(value, dict):
+                for state, substate in zip(states, self._unstack(value, n)):
+                    state[key] = substate
+            else:
+                value = np.broadcast_to(value, (n,))
+                for state, v in zip(states, value):
+                    state[key] = v
+        return states
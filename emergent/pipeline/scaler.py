@@ -1,70 +1,94 @@
+''' The Scaler converts between nested state dicts in physical units and flat arrays
+    normalized to the unit hypercube. The nested layout of the state is compiled
+    once into a list of key paths plus vectors of lower and upper limits, so that
+    normalizing or unnormalizing single points and 2D batches of points reduces
+    to NumPy affine operations.
+
+    Limits may be given in either of two formats at each leaf: a (min, max) tuple,
+    as used by Pipelines, or a {'min': min, 'max': max} dict, as used by Hub.range.
+'''
 import numpy as np
-from copy import deepcopy
 
 class Scaler():
-    ''' General methods '''
     def __init__(self, state, limits):
         self.state = state
         self.limits = limits
-        self.labels = []
-        self.loaded = False
-        self.dim = len(self.state2array(state))
-        self.loaded = True
+        self.compile()
 
-    ''' State conversion functions '''
-    def array2state(self, arr, protostate=None, state=None, i=0):
-        ''' Converts a state dict into a numpy array. '''
-        if i == 0:
-            self.i = 0
-        if state is None:
-            state = {}
-        if protostate is None:
-            protostate = deepcopy(self.state)
-        for key in protostate:
-            if isinstance(protostate[key], dict):
-                state[key] = {}
-                state[key] = self.array2state(arr, protostate[key], state[key], self.i)
-            else:
-                state[key] = arr[self.i]
-                self.i += 1
-        return deepcopy(state)
+    def compile(self):
+        ''' Flattens the state layout into key paths and limit vectors. Call again
+            after changing the state layout or limits in place. '''
+        self.paths = self._paths(self.state)
+        self.labels = [path[-1] for path in self.paths]
+        self.dim = len(self.paths)
+        bounds = np.array([self._bounds(path) for path in self.paths], dtype=float).reshape(-1, 2)
+        self.min = bounds[:, 0]
+        self.max = bounds[:, 1]
+        self.range = self.max - self.min
 
-    def state2array(self, state, arr=np.array([])):
-        ''' Converts a state dict into a numpy array. '''
+    def _paths(self, state, prefix=()):
+        paths = []
         for key in state:
             if isinstance(state[key], dict):
-                arr = self.state2array(state[key], arr)
+                paths.extend(self._paths(state[key], prefix+(key,)))
             else:
-                arr = np.append(arr, state[key])
-                if not self.loaded:
-                    self.labels.append(key)
+                paths.append(prefix+(key,))
+        return paths
+
+    def _bounds(self, path):
+        bounds = self.limits
+        for key in path:
+            bounds = bounds[key]
+        if isinstance(bounds, dict):
+            return bounds['min'], bounds['max']
+        return bounds[0], bounds[1]
+
+    ''' State conversion functions '''
+    def array2state(self, arr):
+        ''' Converts a numpy array into a state dict with keys matching self.state. '''
+        state = {}
+        for path, value in zip(self.paths, arr):
+            d = state
+            for key in path[:-1]:
+                if key not in d:
+                    d[key] = {}
+                d = d[key]
+            d[path[-1]] = value
+        return state
 
+    def array2states(self, arr):
+        ''' Converts each row of a 2D array into a state dict. '''
+        return [self.array2state(row) for row in np.atleast_2d(arr)]
+
+    def state2array(self, state):
+        ''' Converts a state dict into a numpy array. '''
+        arr = np.empty(self.dim)
+        for i, path in enumerate(self.paths):
+            value = state
+            for key in path:
+                value = value[key]
+            arr[i] = value
         return arr
 
-    def normalize(self, state, bounds=None, norm = None):
-        ''' Recursively normalizes a dictionary with arbitrary nesting
-            matching the passed bounds dict. '''
-        if norm is None:
-            norm = {}
-        if bounds is None:
-            bounds = self.limits
-        for key in state:
-            if not isinstance(state[key], dict):
-                norm[key] = (state[key] - bounds[key][0])/(bounds[key][1]-bounds[key][0])
-            else:
-                norm[key] = {}
-                self.normalize(state[key], bounds[key], norm[key])
-        return norm
+    ''' Array scaling functions '''
+    def normalize_array(self, arr):
+        ''' Maps a point or 2D array of points (one per row) from physical units
+            into the unit hypercube. '''
+        return (np.asarray(arr, dtype=float) - self.min) / self.range
 
-    def unnormalize(self, state, bounds=None, unnorm = None):
-        if unnorm is None:
-            unnorm = {}
-        if bounds is None:
-            bounds = self.limits
-        for key in state:
-            if not isinstance(state[key], dict):
-                unnorm[key] = bounds[key][0] + state[key] * (bounds[key][1]-bounds[key][0])
-            else:
-                unnorm[key] = {}
-                self.unnormalize(state[key], bounds[key], unnorm[key])
-        return unnorm
+    def unnormalize_array(self, arr):
+        ''' Maps a point or 2D array of points (one per row) from the unit
+            hypercube into physical units. '''
+        return self.min + np.asarray(arr, dtype=float) * self.range
+
+    ''' State scaling functions '''
+    def normalize(self, state):
+        ''' Normalizes a state dict based on the limits passed in at initialization. '''
+        return self.array2state(self.normalize_array(self.state2array(state)))
+
+    def unnormalize(self, norm):
+        ''' Converts a normalized (0-1) state dict or array to a physical state
+            dict based on the limits passed in at initialization. '''
+        if not isinstance(norm, np.ndarray):
+            norm = self.state2array(norm)
+        return self.array2state(self.unnormalize_array(norm))
@@ -35,13 +35,13 @@ class Source():
             Args:
                 norm (bool): whether the passed state is normalized '''
         if type(state) is np.ndarray:
-            norm_target = self.scaler.array2state(state)
+            if norm:
+                state = self.scaler.unnormalize_array(state)
+            target = self.scaler.array2state(state)
+        elif norm:
+            target = self.scaler.unnormalize(state)
         else:
-            norm_target = state
-        if norm:
-            target = self.scaler.unnormalize(norm_target)
-        else:
-            target = norm_target
+            target = state
 
         results = []
         if 'cycles per sample' not in self.experiment_params:
@@ -49,7 +49,10 @@ class Source():
         for i in range(int(self.experiment_params['cycles per sample'])):
             if self.trigger is not None:
                 self.trigger()
-            c = self.experiment(target, self.experiment_params)
+            if getattr(self.experiment, 'batch', False):
+                c = self.experiment([target], self.experiment_params)[0]
+            else:
+                c = self.experiment(target, self.experiment_params)
             results.append(c)
 
         c = np.mean(results)
@@ -58,3 +61,26 @@ class Source():
             error = np.std(results)/np.sqrt(len(results))
 
         return c
+
+    def measure_batch(self, points, norm=True):
+        ''' Evaluates the cost at each row of a 2D array of normalized points,
+            passing all targets to the experiment at once if it is tagged with
+            the @batch decorator.
+            Args:
+                norm (bool): whether the passed points are normalized '''
+        points = np.atleast_2d(points)
+        if not getattr(self.experiment, 'batch', False):
+            return np.array([self.measure(point, norm=norm) for point in points])
+        if norm:
+            points = self.scaler.unnormalize_array(points)
+        targets = self.scaler.array2states(points)
+
+        results = []
+        if 'cycles per sample' not in self.experiment_params:
+            self.experiment_params['cycles per sample'] = 1
+        for i in range(int(self.experiment_params['cycles per sample'])):
+            if self.trigger is not None:
+                self.trigger()
+            results.append(self.experiment(targets, self.experiment_params))
+
+        return np.mean(np.atleast_2d(results), axis=0)
@@ -0,0 +1,195 @@
+''' The tuning module implements hyperparameter search for pipeline blocks. Each
+    configuration of the tuned parameters is run from a fresh Pipeline for one or
+    more random seeds; runs can be spread over a pool of worker processes, and
+    completed (configuration, seed) runs can be memoized to a JSON file so that
+    repeated or extended searches only run what is new. Results are returned as a
+    pandas DataFrame with one row per run.
+
+    Example:
+        results = tune(block, {'Population': (2, 50), 'Mutation': (0.1, 1)},
+                       steps=10, seeds=5, search='random', processes=4,
+                       cache='tuning.json')
+'''
+import itertools
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+def describe(block):
+    ''' Returns a JSON-serializable description of a block and its subblocks,
+        in the format accepted by BasePipeline.from_json. '''
+    from emergent.pipeline import BasePipeline
+    d = {'name': block.__class__.__name__,
+         'params': {k: v.value for k, v in block.params.items()}}
+    if isinstance(block, BasePipeline):
+        d['subblocks'] = block.to_json()
+    return d
+
+def configurations(bounds, steps, search):
+    ''' Generates the parameter values to test. Ranges with a positive lower
+        bound are sampled logarithmically, others linearly.
+        Args:
+            bounds (dict): maps parameter names to (min, max) tuples
+            steps (int): points per parameter for grid search, or total samples for random search
+            search (str): 'grid' or 'random'
+    '''
+    def space(b, n, random):
+        if b[0] > 0:
+            if random:
+                return 10**np.random.uniform(np.log10(b[0]), np.log10(b[1]), n)
+            return np.logspace(np.log10(b[0]), np.log10(b[1]), n)
+        if random:
+            return np.random.uniform(b[0], b[1], n)
+        return np.linspace(b[0], b[1], n)
+
+    names = list(bounds)
+    if search == 'grid':
+        grid = itertools.product(*[space(bounds[name], steps, False) for name in names])
+        return [dict(zip(names, values)) for values in grid]
+    elif search == 'random':
+        samples = np.array([space(bounds[name], steps, True) for name in names]).T
+        return [dict(zip(names, values)) for values in samples]
+    raise ValueError('Search mode must be "grid" or "random".')
+
+def run(job):
+    ''' Runs one (configuration, seed) job and returns a record of the result.
+        Defined at module level so that it can be run in worker processes. The
+        global NumPy random state is restored afterwards, so that tuning in the
+        calling process does not disturb it. '''
+    from emergent.pipeline import Pipeline
+    description, seed, settings = job
+    rng = np.random.get_state()
+    np.random.seed(seed)
+    try:
+        pipe = Pipeline(settings['state'],
+                        settings['bounds'],
+                        settings['experiment'],
+                        params=settings['params'],
+                        substate=settings['substate'],
+                        verbose=False,
+                        initial_cost=settings['initial_cost'],
+                        budget=settings['budget'])
+        pipe.from_json([description])
+        start = time.time()
+        points, costs = pipe.run()
+    finally:
+        np.random.set_state(rng)
+    return {'evaluations': len(costs),
+            'initial': costs[0],
+            'final': costs[-1],
+            'best': np.min(costs),
+            'cumulative': np.sum(costs),
+            'duration': time.time()-start}
+
+def identify(experiment):
+    ''' Names an experiment by its module and qualified name, plus the name of
+        the hub it is bound to and any function it wraps (e.g. a Simulation),
+        so that same-named experiments on different hubs are distinguished. '''
+    name = '%s.%s'%(getattr(experiment, '__module__', None),
+                    getattr(experiment, '__qualname__', type(experiment).__qualname__))
+    owner = getattr(experiment, '__self__', None)
+    if owner is not None:
+        name += '@%s'%getattr(owner, 'name', id(owner))
+    if hasattr(experiment, 'function'):
+        name += '(%s)'%identify(experiment.function)
+    return name
+
+def key(description, seed, settings):
+    ''' Identifies a run for memoization. '''
+    return json.dumps({'block': description,
+                       'seed': seed,
+                       'experiment': identify(settings['experiment']),
+                       'params': settings['params'],
+                       'state': settings['state'],
+                       'substate': settings['substate'],
+                       'bounds': settings['bounds'],
+                       'budget': settings['budget']},
+                      sort_keys=True, default=str)
+
+def tune(block, bounds, steps=20, mode='cumulative', seeds=1, search='grid', processes=1, cache=None):
+    ''' Runs a block with each tested configuration of its parameters. The block
+        itself is not modified.
+        Args:
+            block (Block): a block attached to a Pipeline
+            bounds (dict): maps parameter names to (min, max) tuples
+            steps (int): points per parameter for grid search, or total samples for random search
+            mode (str): metric reported in the 'metric' column; see Block.tune
+            seeds (int): number of random seeds run for each configuration
+            search (str): 'grid' or 'random'
+            processes (int): worker processes used to run jobs concurrently
+            cache (str): path to a JSON file memoizing completed runs
+
+        Returns:
+            pandas.DataFrame: one row per (configuration, seed) run
+    '''
+    pipeline = block.pipeline
+    settings = {'state': pipeline.state,
+                'bounds': pipeline.scaler.limits,
+                'experiment': pipeline.experiment,
+                'params': pipeline.params,
+                'substate': pipeline.substate,
+                'initial_cost': pipeline.history.costs[0],
+                'budget': None if pipeline.budget is None else pipeline.budget.to_dict()}
+
+    ''' Prepare a description of the block for each configuration '''
+    template = describe(block)
+    jobs = []
+    rows = []
+    for config in configurations(bounds, steps, search):
+        description = json.loads(json.dumps(template))
+        for name, value in config.items():
+            description['params'][name] = block.params[name].type(value)
+        for seed in range(seeds):
+            jobs.append((description, seed, settings))
+            rows.append(dict(description['params'], seed=seed))
+
+    ''' Load memoized runs and run everything else '''
+    memo = {}
+    if cache is not None and os.path.exists(cache):
+        with open(cache, 'r') as file:
+            memo = json.load(file)
+    keys = [key(*job) for job in jobs]
+    todo = {}
+    for k, job in zip(keys, jobs):
+        if k not in memo and k not in todo:
+            todo[k] = job
+
+    if processes > 1 and len(todo) > 1:
+        chunksize = max(1, len(todo)//(4*processes))
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for k, record in zip(todo, executor.map(run, todo.values(), chunksize=chunksize)):
+                memo[k] = record
+        save(memo, cache)
+    else:
+        for k, job in todo.items():
+            memo[k] = run(job)
+            save(memo, cache)
+
+    records = []
+    for row, k in zip(rows, keys):
+        record = dict(row)
+        record.update(memo[k])
+        records.append(record)
+    results = pd.DataFrame(records)
+    results['metric'] = [metric(r, mode) for r in records]
+    return results
+
+def metric(record, mode):
+    ''' Scores a run from its summary statistics; lower scores are better. '''
+    if mode == 'iterations':
+        return record['evaluations']
+    elif mode == 'improvement':
+        return -(record['final']-record['initial'])/record['evaluations']
+    elif mode == 'result':
+        return -(record['final']-record['initial'])
+    elif mode == 'cumulative':
+        return record['cumulative']
+
+def save(memo, cache):
+    if cache is None:
+        return
+    with open(cache, 'w') as file:
+        json.dump(memo, file, default=float)
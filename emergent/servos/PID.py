@@ -1,8 +1,41 @@
 from emergent.utilities.containers import Parameter
 from emergent.utilities.decorators import servo
+import threading
+from emergent.servos.manager import shared
 import numpy as np
-import pandas as pd
-import time
+import logging as log
+
+class PIDController():
+    ''' A positional PID controller acting on a single knob around its initial
+        value. The derivative uses the measured time between samples, the output
+        is clamped to the knob's limits, and the integrator is frozen while the
+        output is saturated unless integrating would move it back into range. '''
+    def __init__(self, kp, ki, kd, sign, offset, limits=(-np.inf, np.inf)):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.sign = sign
+        self.offset = offset
+        self.min, self.max = limits
+        self.integral = 0
+        self.last_error = None
+        self.last_time = None
+
+    def update(self, e, t):
+        ''' Returns the output for the error e measured at time t. '''
+        dt = 0 if self.last_time is None else t - self.last_time
+        derivative = 0
+        if dt > 0:
+            derivative = self.kd * (e - self.last_error) / dt
+        integral = self.integral + self.ki * e * dt
+        self.last_error, self.last_time = e, t
+
+        output = self.offset - self.sign*(self.kp * e + integral + derivative)
+        clamped = np.clip(output, self.min, self.max)
+        change = -self.sign*(integral - self.integral)
+        if clamped == output or (output > self.max and change < 0) or (output < self.min and change > 0):
+            self.integral = integral
+        return clamped
 
 class PID():
     def __init__(self):
@@ -29,6 +62,28 @@ class PID():
                                             min = -1,
                                             max = 1,
                                             description = 'Sign of correction')
+        self.params['Rate'] = Parameter(name= 'Rate',
+                                            value = 100,
+                                            min = 0.001,
+                                            max = 10000,
+                                            description = 'Loop rate in Hz')
+        self.params['Input'] = Parameter(name= 'Input',
+                                            value = '',
+                                            type = str,
+                                            description = "Register of the servoed device to read as the process variable, e.g. 'AIN0'; empty uses the experiment's error")
+        self.params['Setpoint'] = Parameter(name= 'Setpoint',
+                                            value = 0,
+                                            description = 'Target value of the input register')
+
+    def limits(self, device, knob):
+        ''' Returns the output limits of a knob from Hub.range, falling back to
+            the range passed to the sampler. '''
+        limits = self.sampler.hub.range.get(device, {}).get(knob, None)
+        if limits is None:
+            limits = self.sampler.limits[device][knob]
+        if isinstance(limits, dict):
+            return limits['min'], limits['max']
+        return tuple(limits)
 
     @servo
     def run(self, state, callback = None):
@@ -42,33 +97,64 @@ class PID():
         knobs = list(state[device].keys())
         assert len(knobs) == 1
         knob = knobs[0]
-        knob_node = self.sampler.hub.devices[device].knobs[knob]
-        knob_node.error_history = pd.Series()
-        last_error = error(state, self.sampler.experiment_params)
-        last_time = time.time()
-        integral = 0
-        e = None
-        while callback(e):
-            e = error(state, self.sampler.experiment_params)
-            t = time.time()
-            self.sampler.history.loc[t,'cost']=e
-            for device in state:
-                for knob in state[device]:
-                    self.sampler.history.loc[t,device+'.'+knob] = state[device][knob]
-            # print('State:', state, 'Error:', e)
-            delta_t = t - last_time
-            delta_e = e - last_error
-
-            proportional = self.sampler.algorithm_params['Proportional gain'] * e
-            integral += self.sampler.algorithm_params['Integral gain'] * e * delta_t
-            derivative = self.sampler.algorithm_params['Derivative gain'] * delta_e/delta_t
+        controller = PIDController(self.params['Proportional gain'].value,
+                                   self.params['Integral gain'].value,
+                                   self.params['Derivative gain'].value,
+                                   self.params['Sign'].value,
+                                   state[device][knob],
+                                   self.limits(device, knob))
+        ''' Servo the knob on the hub's shared ServoManager. With an input
+            register, the register and the knob are read and written as
+            (device, register) pairs, which the manager coalesces with other
+            servos on the same device; otherwise the experiment's error is
+            measured at the current state. '''
+        hub = self.sampler.hub
+        register = self.params['Input'].value
+        if register == '':
+            params = self.sampler.experiment_params
+            input = lambda: error(state, params)
+            setpoint = 0
+            def output(value):
+                state[device][knob] = value     # gets passed into error in the next loop
+        else:
+            obj = hub.devices[device]
+            if not hasattr(obj, '_read_array'):
+                raise ValueError('Device %s does not support register reads.'%device)
+            input = (obj, register)
+            setpoint = self.params['Setpoint'].value
+            if hasattr(obj, '_write_array'):
+                output = (obj, knob)
+            else:
+                output = lambda value: hub.actuate({device: {knob: value}})
 
-            last_time = t
-            last_error = e
+        done = threading.Event()
+        last = [state[device][knob]]
+        def on_sample(sample):
+            t, value, e, out = sample
+            self.sampler.record(self.sampler.scaler.normalize({device: {knob: last[0]}}), e, t=t)
+            last[0] = out
+            if not callback(e):
+                done.set()
 
-            target = proportional + integral + derivative
-            # print('Correction:', target)
-            state[device][knob] -= self.sampler.algorithm_params['Sign']*target  # gets passed into error in the next loop
+        manager = shared(hub)
+        name = '%s.%s'%(device, knob)
+        channel = manager.attach(name, input, output, controller, self.params['Rate'].value, setpoint, on_sample)
+        try:
+            while not done.wait(0.1):
+                if channel.error is not None:
+                    raise channel.error
+        finally:
+            manager.release(name)
+        if register != '':
+            hub.actuate({device: {knob: last[0]}}, force=True)     # sync Hub.state with the register
+        self.stats = channel.stats
+        summary = self.stats.summary()
+        if 'rate' in summary:
+            log.info('Servo %s ran %i ticks at %.1f Hz; %i skipped; jitter p99 %.2e s; latency p99 %.2e s.',
+                     name, summary['samples'], summary['rate'], summary['skipped'],
+                     summary['jitter']['p99'], summary['latency']['p99'])
+        t, points, costs, errors = self.sampler.get_history()
+        return points, costs
 
     def set_params(self, params):
         for p in params:
@@ -1 +1,3 @@
 from .PID import PID
+from .engine import ServoEngine, ServoStats, Scheduler
+from .manager import ServoManager, ServoChannel, shared
@@ -0,0 +1,192 @@
+''' The servo engine runs a control loop at a fixed period. Each tick is scheduled
+    against the start time of the loop rather than the end of the previous tick,
+    so the sample rate does not drift when an iteration runs long; ticks missed
+    entirely are skipped rather than run back to back. The loop sleeps until
+    shortly before each deadline and spins for the remainder to reduce jitter.
+
+    The loop can run in a dedicated thread or in a separate process. In both
+    cases the step function is called once per tick and its return value is
+    passed to an on_sample callback in the calling process, together with the
+    timing of the tick, which is collected in a ServoStats object for jitter
+    and latency reporting. In process mode the step function must be picklable.
+
+    Example:
+        engine = ServoEngine(step, period=0.01, on_sample=record)
+        engine.run()            # blocks until step raises StopIteration or stop() is called
+        print(engine.stats.summary())
+'''
+import multiprocessing
+import threading
+import time
+import logging as log
+import numpy as np
+from emergent.utilities.buffers import RingBuffer
+
+class Scheduler():
+    def __init__(self, period, spin=0.0005):
+        ''' Args:
+                period (float): loop period in seconds
+                spin (float): time before each deadline spent busy-waiting
+                              instead of sleeping
+        '''
+        self.period = period
+        self.spin = spin
+        self.start = time.perf_counter()
+        self.ticks = 0
+        self.skipped = 0
+
+    def wait(self):
+        ''' Blocks until the next tick and returns its deadline. If one or more
+            ticks have already passed, they are skipped. '''
+        self.ticks += 1
+        deadline = self.start + self.ticks*self.period
+        now = time.perf_counter()
+        if now > deadline + self.period:
+            missed = int((now - deadline) // self.period)
+            self.ticks += missed
+            self.skipped += missed
+            deadline += missed*self.period
+        sleep_until(deadline, self.spin)
+        return deadline
+
+def sleep_until(deadline, spin=0.0005):
+    ''' Sleeps until shortly before a perf_counter deadline, then busy-waits
+        for the remainder. '''
+    remaining = deadline - time.perf_counter() - spin
+    if remaining > 0:
+        time.sleep(remaining)
+    while time.perf_counter() < deadline:
+        continue
+
+class ServoStats():
+    ''' Timing of each tick of a servo loop: the scheduled deadline, the actual
+        start time and the duration of the step (latency). '''
+    def __init__(self, period, capacity=100000):
+        self.period = period
+        self.buffer = RingBuffer(['deadline', 'start', 'latency'], capacity)
+
+    def append(self, timing):
+        self.buffer.append(timing)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    @property
+    def jitter(self):
+        ''' Delay of each tick past its deadline in seconds. '''
+        rows = self.buffer.array()
+        return rows[:, 1] - rows[:, 0]
+
+    @property
+    def latency(self):
+        ''' Duration of each step in seconds. '''
+        return self.buffer.array()[:, 2]
+
+    def histogram(self, quantity='jitter', bins=50):
+        ''' Returns the counts and bin edges of the jitter or latency. '''
+        return np.histogram(getattr(self, quantity), bins=bins)
+
+    def summary(self):
+        ''' Returns the achieved rate, the number of skipped ticks, and
+            statistics of the jitter and latency in seconds. '''
+        rows = self.buffer.array()
+        if len(rows) < 2:
+            return {'samples': len(rows)}
+        deadlines = rows[:, 0]
+        skipped = np.round(np.diff(deadlines)/self.period).astype(int) - 1
+        d = {'samples': len(rows),
+             'rate': (len(rows)-1)/(deadlines[-1]-deadlines[0]),
+             'skipped': int(skipped.sum())}
+        for name, x in [('jitter', rows[:, 1]-rows[:, 0]), ('latency', rows[:, 2])]:
+            d[name] = {'mean': np.mean(x),
+                       'std': np.std(x),
+                       'median': np.median(x),
+                       'p99': np.percentile(x, 99),
+                       'max': np.max(x)}
+        return d
+
+def loop(step, period, stopped, emit):
+    ''' Calls step once per period until it raises StopIteration or the stopped
+        event is set, passing each result and its timing to emit. '''
+    scheduler = Scheduler(period)
+    while not stopped.is_set():
+        deadline = scheduler.wait()
+        start = time.perf_counter()
+        try:
+            result = step()
+        except StopIteration:
+            break
+        emit(result, (deadline, start, time.perf_counter()-start))
+
+def _process_loop(step, period, stopped, queue):
+    ''' Runs the loop in a child process, forwarding results through a queue. '''
+    try:
+        loop(step, period, stopped, lambda result, timing: queue.put((result, timing)))
+    finally:
+        queue.put(None)
+
+class ServoEngine():
+    def __init__(self, step, period, on_sample=None, mode='thread', capacity=100000):
+        ''' Args:
+                step (callable): called with no arguments once per tick; raise
+                                 StopIteration to end the loop
+                period (float): loop period in seconds
+                on_sample (callable): called with the result of each step
+                mode (str): 'thread' or 'process'
+                capacity (int): number of ticks retained in the timing statistics
+        '''
+        if mode not in ['thread', 'process']:
+            raise ValueError('Mode must be "thread" or "process".')
+        self.step = step
+        self.period = period
+        self.on_sample = on_sample
+        self.mode = mode
+        self.stats = ServoStats(period, capacity)
+        self.worker = None
+
+    def emit(self, result, timing):
+        self.stats.append(timing)
+        if self.on_sample is not None:
+            self.on_sample(result)
+
+    def start(self):
+        ''' Starts the loop without blocking. '''
+        if self.mode == 'thread':
+            self.stopped = threading.Event()
+            self.worker = threading.Thread(target=loop, args=(self.step, self.period, self.stopped, self.emit))
+            self.worker.start()
+        else:
+            self.stopped = multiprocessing.Event()
+            queue = multiprocessing.Queue()
+            self.process = multiprocessing.Process(target=_process_loop, args=(self.step, self.period, self.stopped, queue))
+            self.process.start()
+            self.worker = threading.Thread(target=self.drain, args=(queue,))
+            self.worker.start()
+
+    def drain(self, queue):
+        ''' Passes results from the child process to emit until it exits. '''
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            self.emit(*item)
+        self.process.join()
+
+    def stop(self):
+        ''' Ends the loop after the current tick. '''
+        self.stopped.set()
+
+    def join(self):
+        ''' Waits for the loop to end and logs its timing statistics. '''
+        self.worker.join()
+        summary = self.stats.summary()
+        if 'rate' in summary:
+            log.info('Servo ran %i ticks at %.1f Hz (target %.1f Hz); %i skipped; jitter p99 %.2e s; latency p99 %.2e s.',
+                     summary['samples'], summary['rate'], 1/self.period, summary['skipped'],
+                     summary['jitter']['p99'], summary['latency']['p99'])
+
+    def run(self):
+        ''' Runs the loop, blocking until it ends. '''
+        self.start()
+        self.join()
+        return self.stats
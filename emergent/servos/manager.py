@@ -0,0 +1,225 @@
+''' The ServoManager multiplexes many single-knob servo loops, possibly at
+    different rates, on one timing thread. Each channel keeps its own drift-free
+    schedule; on every wakeup the manager services all channels that are due
+    together, so that reads from a shared device are coalesced into one call
+    (e.g. a single eReadNames for several LabJack inputs) and so are writes.
+
+    Inputs and outputs are either callables, which are serviced one at a time,
+    or (device, register) tuples. Tuples are grouped by device and serviced
+    through the device's _read_array(registers) and _write_array(registers,
+    values) methods, which the LabJack driver implements with eReadNames and
+    eWriteNames.
+
+    Example:
+        manager = ServoManager()
+        manager.add('slowing', input=(labjack, 'AIN0'), output=(labjack, 'DAC0'),
+                    controller=PIDController(0.5, 10, 0, 1, 2.5, (0, 5)), rate=500, setpoint=1.2)
+        manager.add('trap', input=(labjack, 'AIN1'), output=(labjack, 'DAC1'),
+                    controller=PIDController(0.2, 5, 0, 1, 2.5, (0, 5)), rate=100, setpoint=0.8)
+        manager.start()
+        ...
+        manager.stop()
+
+    PID servos of a hub share the manager returned by shared(hub), adding and
+    removing their channels with attach() and release(), which start and stop
+    the timing thread as needed.
+'''
+import threading
+import time
+import logging as log
+from emergent.servos.engine import ServoStats, sleep_until
+
+class ServoChannel():
+    def __init__(self, name, input, output, controller, rate, setpoint=0, on_sample=None, capacity=100000):
+        ''' Args:
+                name (str): identifier of the channel
+                input: a callable returning the process variable, or a
+                       (device, register) tuple
+                output: a callable accepting the controller output, or a
+                        (device, register) tuple
+                controller (PIDController): maps the error (input minus
+                                            setpoint) to an output
+                rate (float): loop rate in Hz
+                setpoint (float): target value of the input
+                on_sample (callable): called with (time, input, error, output)
+                                      after each tick
+                capacity (int): number of ticks retained in the timing statistics
+        '''
+        self.name = name
+        self.input = input
+        self.output = output
+        self.controller = controller
+        self.period = 1/rate
+        self.setpoint = setpoint
+        self.on_sample = on_sample
+        self.stats = ServoStats(self.period, capacity)
+        self.start = None
+        self.ticks = 0
+        self.error = None       # exception raised by the last failed tick
+
+    def schedule(self, start):
+        self.start = start
+        self.ticks = 1
+        self.deadline = start + self.period
+
+    def advance(self, now):
+        ''' Moves to the next deadline, skipping any already missed. '''
+        self.ticks += 1
+        if now > self.start + self.ticks*self.period + self.period:
+            self.ticks += int((now - self.start - self.ticks*self.period) // self.period)
+        self.deadline = self.start + self.ticks*self.period
+
+class ServoManager():
+    def __init__(self, spin=0.0005, tolerance=0.0001):
+        ''' Args:
+                spin (float): time before each deadline spent busy-waiting
+                tolerance (float): channels due within this many seconds of the
+                                   earliest deadline are serviced together
+        '''
+        self.spin = spin
+        self.tolerance = tolerance
+        self.channels = {}
+        self.lock = threading.Lock()
+        self.control = threading.Lock()     # serializes attach() and release()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add(self, name, input, output, controller, rate, setpoint=0, on_sample=None):
+        ''' Adds a channel; it is scheduled immediately if the manager is running.
+            Its ticks are aligned to the manager's start time, so that channels
+            with commensurate rates fall due together and share device calls. '''
+        channel = ServoChannel(name, input, output, controller, rate, setpoint, on_sample)
+        with self.lock:
+            if self.thread is not None:
+                channel.schedule(self.epoch)
+                channel.ticks = int((time.perf_counter() - self.epoch) // channel.period) + 1
+                channel.deadline = self.epoch + channel.ticks*channel.period
+            self.channels[name] = channel
+        return channel
+
+    def remove(self, name):
+        with self.lock:
+            del self.channels[name]
+
+    def attach(self, name, input, output, controller, rate, setpoint=0, on_sample=None):
+        ''' Adds a channel, starting the timing thread if it is not running. '''
+        with self.control:
+            if name in self.channels:
+                raise ValueError('A servo channel named %s is already running.'%name)
+            channel = self.add(name, input, output, controller, rate, setpoint, on_sample)
+            if self.thread is None:
+                self.start()
+        return channel
+
+    def release(self, name):
+        ''' Removes a channel, stopping the timing thread once none remain. '''
+        with self.control:
+            self.remove(name)
+            if len(self.channels) == 0:
+                self.stop()
+
+    def start(self):
+        ''' Starts the timing thread. '''
+        self.stopped.clear()
+        self.epoch = time.perf_counter()
+        with self.lock:
+            for channel in self.channels.values():
+                channel.schedule(self.epoch)
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+
+    def stop(self):
+        ''' Stops the timing thread after the current tick. '''
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stopped.is_set():
+            with self.lock:
+                channels = list(self.channels.values())
+            if len(channels) == 0:
+                time.sleep(0.01)
+                continue
+            deadline = min(channel.deadline for channel in channels)
+            sleep_until(deadline, self.spin)
+            due = [channel for channel in channels if channel.deadline <= deadline + self.tolerance]
+            try:
+                self.tick(due)
+            except Exception as e:
+                log.error('Servo tick failed for %s: %s'%([channel.name for channel in due], e))
+                for channel in due:
+                    channel.error = e
+                    channel.advance(time.perf_counter())
+
+    def tick(self, channels):
+        ''' Reads all inputs of the passed channels with one call per device,
+            updates their controllers, then writes all outputs with one call
+            per device. '''
+        start = time.perf_counter()
+        values = self.read([channel.input for channel in channels])
+        t = time.time()
+        outputs = []
+        errors = []
+        for channel, value in zip(channels, values):
+            e = value - channel.setpoint
+            errors.append(e)
+            outputs.append(channel.controller.update(e, t))
+        self.write([channel.output for channel in channels], outputs)
+        end = time.perf_counter()
+
+        for channel, value, e, output in zip(channels, values, errors, outputs):
+            channel.stats.append((channel.deadline, start, end-start))
+            if channel.on_sample is not None:
+                channel.on_sample((t, value, e, output))
+            channel.advance(end)
+
+    def read(self, inputs):
+        ''' Returns the value of each input, grouping (device, register) inputs
+            into one _read_array call per device. '''
+        values = [None]*len(inputs)
+        for device, (indices, registers) in group(inputs).items():
+            for i, value in zip(indices, device._read_array(registers)):
+                values[i] = value
+        for i, input in enumerate(inputs):
+            if callable(input):
+                values[i] = input()
+        return values
+
+    def write(self, outputs, values):
+        ''' Writes each value, grouping (device, register) outputs into one
+            _write_array call per device. '''
+        for device, (indices, registers) in group(outputs).items():
+            device._write_array(registers, [float(values[i]) for i in indices])
+        for output, value in zip(outputs, values):
+            if callable(output):
+                output(value)
+
+    def summary(self):
+        ''' Returns the timing statistics of each channel. '''
+        with self.lock:
+            return {name: channel.stats.summary() for name, channel in self.channels.items()}
+
+_shared = threading.Lock()
+
+def shared(hub):
+    ''' Returns the ServoManager shared by all servos of a hub, creating it on
+        first use. '''
+    with _shared:
+        if getattr(hub, 'servo_manager', None) is None:
+            hub.servo_manager = ServoManager()
+        return hub.servo_manager
+
+def group(items):
+    ''' Groups (device, register) tuples by device, returning a dict mapping
+        each device to the indices and registers of its items. '''
+    groups = {}
+    for i, item in enumerate(items):
+        if callable(item):
+            continue
+        device, register = item
+        indices, registers = groups.setdefault(device, ([], []))
+        indices.append(i)
+        registers.append(register)
+    return groups
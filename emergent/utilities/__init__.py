@@ -1 +1 @@
-from .decorators import error, experiment, algorithm, servo, trigger
+from .decorators import error, experiment, batch, algorithm, servo, trigger
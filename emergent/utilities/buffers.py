@@ -1,3 +1,6 @@
+import threading
+import numpy as np
+
 class MacroBuffer(list):
     def __init__(self, parent):
         super().__init__()
@@ -101,3 +104,55 @@ class StateBuffer(list):
     def prune(self):
         while len(self) > self.length:
             del self[0]
+
+class RingBuffer():
+    ''' A fixed-capacity, preallocated buffer of rows of floats. Once full, each
+        new row overwrites the oldest, so memory use and append time stay
+        constant for servos running indefinitely. A DataFrame view is built
+        only when requested and reused until the next append. '''
+    def __init__(self, columns, capacity=100000):
+        ''' Args:
+                columns (list): names of the columns; the first is used as the
+                                index of the DataFrame view
+                capacity (int): maximum number of rows retained
+        '''
+        self.columns = list(columns)
+        self.capacity = capacity
+        self._data = np.empty((capacity, len(self.columns)))
+        self.position = 0       # index of the next row to write
+        self.length = 0
+        self.lock = threading.Lock()
+        self.count = 0          # total rows ever appended
+        self._frame = None
+
+    def __len__(self):
+        return self.length
+
+    def append(self, row):
+        ''' Adds a row, overwriting the oldest if the buffer is full. '''
+        with self.lock:
+            self._data[self.position] = row
+            self.position = (self.position + 1) % self.capacity
+            self.length = min(self.length + 1, self.capacity)
+            self.count += 1
+
+    def array(self, start=0, stop=None):
+        ''' Returns a copy of the retained rows in chronological order, optionally
+            sliced as rows[start:stop]. '''
+        return self._snapshot(start, stop)[1]
+
+    def _snapshot(self, start=0, stop=None):
+        with self.lock:
+            oldest = self.position if self.length == self.capacity else 0
+            indices = (oldest + np.arange(self.length)[start:stop]) % self.capacity
+            return self.count, self._data[indices]
+
+    def frame(self):
+        ''' Returns the retained rows as a DataFrame indexed by the first column. '''
+        if self._frame is None or self._frame[0] != self.count:
+            import pandas as pd
+            count, rows = self._snapshot()
+            frame = pd.DataFrame(rows[:, 1:], index=rows[:, 0], columns=self.columns[1:])
+            frame.index.name = self.columns[0]
+            self._frame = (count, frame)
+        return self._frame[1]
@@ -12,6 +12,12 @@ def thread(func, *args, **kwargs):
 def experiment(func, hub, state, params):
     return func(hub, state, params)
 
+def batch(func):
+    ''' Marks an experiment as accepting a list of states and returning an array
+        of costs, so that pipelines can submit a whole population in one call. '''
+    func.batch = True
+    return func
+
 @decorator.decorator
 def error(func, *args, **kwargs):
     e = func(*args, **kwargs)
@@ -25,22 +31,22 @@ def trigger(func, *args, **kwargs):
 
 @decorator.decorator
 def algorithm(func, *args, **kwargs):
-    func(*args, **kwargs)
+    result = func(*args, **kwargs)
     args[0].sampler.hub.save()
+    return result
 
 @decorator.decorator
 def servo(func, *args, **kwargs):
-    func(*args, **kwargs)
+    result = func(*args, **kwargs)
     args[0].sampler.hub.save()
+    return result
 
 @decorator.decorator
-def queue(func, *args, **kwargs):
+def queue(func, priority=0, timeout=None, *args, **kwargs):
+    ''' Runs a device method through the device's FIFO queue and waits for the
+        result. Use as @queue, or as @queue(priority=-1, timeout=1) to run a
+        method ahead of calls with higher priority values or to give up after
+        a number of seconds. '''
     obj = args[0]
-    id = time.time()
     q = getattr(obj, 'queue')
-    q.add(func, id, *args, **kwargs)
-    while True:
-        try:
-            return q.buffer[id]
-        except KeyError:
-            continue
+    return q.call(func, *args, priority=priority, timeout=timeout, **kwargs)
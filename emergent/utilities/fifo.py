@@ -1,41 +1,120 @@
-''' This module implements a basic FIFO queue which allows messages to be simultaneously
+''' This module implements a FIFO command queue which allows messages to be simultaneously
     dispatched to the same device by EMERGENT without risking message overlap on the
     actual device.
+
+    Each call is submitted as a Message holding a concurrent.futures.Future, which
+    the caller waits on; the worker thread executes messages in order of priority
+    (lower values first), then in order of submission. The queue can be bounded,
+    calls can time out, and the time each message spent waiting and executing is
+    recorded for latency reporting.
 '''
+import itertools
 import queue
+import threading
+import time
 import logging as log
+import numpy as np
+from concurrent.futures import Future, TimeoutError
+from emergent.utilities.buffers import RingBuffer
 
 class Message():
     ''' Container for queue message-passing '''
-    def __init__(self, ID, *args, **kwargs):
+    def __init__(self, func, priority, *args, **kwargs):
+        self.func = func
+        self.priority = priority
         self.args = args
         self.kwargs = kwargs
-        self.ID = ID
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+    def run(self):
+        return self.func(*self.args, **self.kwargs)
 
-class FIFO(queue.Queue):
+class FIFO(queue.PriorityQueue):
     ''' Implements a threaded queue which continuously executes commands in
         a FIFO order. '''
-    def __init__(self):
-        super().__init__()
-        self.buffer = {}
-
-    def add(self, func, ID, *args, **kwargs):
-        ''' Adds a function with optional positional and keyword arguments to the queue. '''
-        class NewMessage(Message):
-            ''' A container for a queued function call. '''
-            def run(self):
-                ''' Return the function defined by the add() method. '''
-                return func(*self.args)
-        log.debug('Added %s to queue with ID %f.', func, ID)
-        self.put(NewMessage(ID, *args, **kwargs))
-
-    def next(self):
-        ''' Retrieves and executes the next function on a FIFO basis. '''
-        msg = self.get()
-        result = msg.run()
-        self.buffer[msg.ID] = result
-
-    def run(self, stopped):
+    def __init__(self, name='', maxsize=0, timeout=None, capacity=10000):
+        ''' Args:
+                name (str): label used in log messages
+                maxsize (int): maximum number of pending messages; 0 is unbounded
+                timeout (float): default time in seconds to wait for a slot in a
+                                 full queue and for each result; None waits forever
+                capacity (int): number of recent messages retained for latency metrics
+        '''
+        super().__init__(maxsize)
+        self.name = name
+        self.timeout = timeout
+        self.counter = itertools.count()
+        self.latency = RingBuffer(['submitted', 'wait', 'execution'], capacity)
+        self.counts = {}
+        self.worker = None
+
+    def submit(self, func, *args, priority=0, timeout=None, **kwargs):
+        ''' Adds a function call to the queue and returns a Future holding its result.
+            Raises queue.Full if the queue stays full for longer than the timeout. '''
+        if timeout is None:
+            timeout = self.timeout
+        msg = Message(func, priority, *args, **kwargs)
+        self.put((priority, next(self.counter), msg), timeout=timeout)
+        log.debug('Added %s to queue %s with priority %i.', func, self.name, priority)
+        return msg.future
+
+    def call(self, func, *args, priority=0, timeout=None, **kwargs):
+        ''' Submits a function call and blocks until it returns. Calls made
+            from the worker thread itself run immediately to avoid deadlock. A
+            call still pending after the timeout is cancelled and raises
+            concurrent.futures.TimeoutError. '''
+        if threading.current_thread() is self.worker:
+            return func(*args, **kwargs)
+        if timeout is None:
+            timeout = self.timeout
+        future = self.submit(func, *args, priority=priority, timeout=timeout, **kwargs)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def next(self, timeout=None):
+        ''' Retrieves and executes the next function in order of priority. '''
+        try:
+            priority, count, msg = self.get(timeout=timeout)
+        except queue.Empty:
+            return
+        if not msg.future.set_running_or_notify_cancel():
+            return
+        start = time.perf_counter()
+        try:
+            msg.future.set_result(msg.run())
+        except BaseException as e:
+            msg.future.set_exception(e)
+        end = time.perf_counter()
+        self.latency.append((msg.submitted, start-msg.submitted, end-start))
+        name = getattr(msg.func, '__name__', str(msg.func))
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def run(self, stopped=lambda: False):
         ''' Continuously retrieve and execute the next task. '''
+        self.worker = threading.current_thread()
         while not stopped():
-            self.next()
+            self.next(timeout=0.1)
+
+    def start(self):
+        ''' Runs the queue in a new daemon thread. '''
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def metrics(self):
+        ''' Returns the number of calls per function and statistics of the
+            time recent messages spent waiting in the queue and executing. '''
+        rows = self.latency.array()
+        d = {'pending': self.qsize(), 'calls': dict(self.counts)}
+        if len(rows) == 0:
+            return d
+        for name, x in [('wait', rows[:, 1]), ('execution', rows[:, 2])]:
+            d[name] = {'mean': float(np.mean(x)),
+                       'median': float(np.median(x)),
+                       'p99': float(np.percentile(x, 99)),
+                       'max': float(np.max(x))}
+        return d
@@ -0,0 +1,62 @@
+''' Reports the time taken to import EMERGENT modules, so that slow imports
+    creeping back into the startup path are easy to spot. Each module is
+    imported in a fresh interpreter with python -X importtime.
+
+    Example:
+        python -m emergent.utilities.importtime emergent.core emergent.API.API --top 15
+
+    With --limit, the command exits with status 1 if any module takes longer
+    than the given number of seconds to import.
+'''
+import argparse
+import subprocess
+import sys
+
+def profile(module):
+    ''' Imports a module in a new interpreter and returns a list of
+        (name, self, cumulative) import times in seconds, in import order. '''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s'%module],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if not fields[0].strip().isdigit():
+            continue                        # header
+        entries.append((fields[2].strip(), int(fields[0])/1e6, int(fields[1])/1e6))
+    if result.returncode != 0:
+        raise ImportError('Could not import %s:\n%s'%(module, result.stderr.strip().splitlines()[-1]))
+    return entries
+
+def report(module, top=20):
+    ''' Returns a text report of the total import time of a module and its
+        slowest dependencies by cumulative time. '''
+    entries = profile(module)
+    total = entries[-1][2]
+    lines = ['%s: %.3f s'%(module, total)]
+    for name, self_time, cumulative in sorted(entries, key=lambda e: -e[2])[1:top+1]:
+        lines.append('  %8.3f s %8.3f s  %s'%(cumulative, self_time, name))
+    return total, '\n'.join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Profile the import time of EMERGENT modules.')
+    parser.add_argument('modules', nargs='*', default=['emergent.core', 'emergent.pipeline', 'emergent.API.API'])
+    parser.add_argument('--top', type=int, default=20, help='number of dependencies to list per module')
+    parser.add_argument('--limit', type=float, default=None, help='maximum import time in seconds')
+    args = parser.parse_args()
+
+    failed = False
+    print('  cumulative     self  module')
+    for module in args.modules:
+        try:
+            total, text = report(module, args.top)
+        except ImportError as e:
+            print(e)
+            failed = True
+            continue
+        print(text)
+        if args.limit is not None and total > args.limit:
+            print('%s exceeds the limit of %.3f s.'%(module, args.limit))
+            failed = True
+    sys.exit(int(failed))
@@ -8,8 +8,10 @@ def methodsWithDecorator(cls, decoratorName):
     for i,line in enumerate(sourcelines):
         line = line.strip()
         if line.split('(')[0].strip() == '@'+decoratorName: # leaving a bit out
-            nextLine = sourcelines[i+1]
-            name = nextLine.split('def')[1].split('(')[0].strip()
+            j = i+1
+            while sourcelines[j].strip().startswith('@'):     # skip stacked decorators
+                j += 1
+            name = sourcelines[j].split('def')[1].split('(')[0].strip()
             methods.append(name)
     return methods
 
@@ -0,0 +1,242 @@
+''' Gaussian process regressors for models whose history grows without bound.
+
+    The IncrementalGaussianProcess wraps sklearn's GaussianProcessRegressor so that
+    long optimizations do not pay for a full O(n^3) refit with hyperparameter
+    restarts at every iteration. New observations are appended through rank-one
+    updates of the Cholesky factor of the kernel matrix, which costs O(n^2) with the
+    hyperparameters held fixed. The kernel is only re-optimized on a schedule:
+    after a configurable number of new points, or when the log-likelihood per
+    point drifts from its value at the last optimization.
+
+    The SparseGaussianProcess bounds both time and memory through a fixed set of
+    inducing points and a pruned window of training points. '''
+import numpy as np
+import logging as log
+from scipy.linalg import solve_triangular, cho_solve
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import Sum, WhiteKernel
+
+class IncrementalGaussianProcess():
+    def __init__(self, kernel, refit_interval=10, drift_tolerance=0.5, restarts=10, alpha=1e-10):
+        ''' Args:
+                kernel (sklearn.gaussian_process.kernels.Kernel): initial kernel
+                refit_interval (int): number of new points after which the kernel is re-optimized
+                drift_tolerance (float): change in log-likelihood per point which triggers re-optimization
+                restarts (int): optimizer restarts used when re-optimizing the kernel
+                alpha (float): value added to the diagonal of the kernel matrix
+        '''
+        self.kernel = kernel
+        self.kernel_ = None
+        self.refit_interval = refit_interval
+        self.drift_tolerance = drift_tolerance
+        self.restarts = restarts
+        self.alpha = alpha
+        self.length = 0
+        self.refits = 0
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def X_train_(self):
+        return self._X[:self.length]
+
+    @property
+    def y_train_(self):
+        return self._y[:self.length]
+
+    @property
+    def L_(self):
+        return self._L[:self.length, :self.length]
+
+    def fit(self, X, y):
+        ''' Trains on the passed data. Points matching the start of the data
+            already trained on are kept; any other previous points are removed
+            by truncating the Cholesky factor, and the new points are appended.
+            If nothing matches, or if the refit schedule is due, the kernel is
+            re-optimized on all points. '''
+        X = np.atleast_2d(X)
+        y = np.asarray(y, dtype=float)
+        if self.kernel_ is None:
+            return self.optimize(X, y)
+        m = min(self.length, len(y))
+        match = np.all(X[:m] == self.X_train_[:m], axis=1) & (y[:m] == self.y_train_[:m])
+        n = m if match.all() else np.argmin(match)
+        if n == 0:
+            return self.optimize(X, y)
+        if n < self.length:
+            self.length = n
+            self.alpha_ = cho_solve((self.L_, True), self.y_train_)
+        for x, c in zip(X[n:], y[n:]):
+            self.update(x, c)
+        if self.length - self.refit_length >= self.refit_interval:
+            return self.optimize(X, y)
+        drift = self.log_marginal_likelihood()/self.length - self.refit_likelihood
+        if np.abs(drift) > self.drift_tolerance:
+            log.debug('Log-likelihood drifted by %f per point; re-optimizing kernel.'%drift)
+            return self.optimize(X, y)
+        return self
+
+    def optimize(self, X, y):
+        ''' Re-optimizes the kernel hyperparameters on all passed points with
+            sklearn, starting from the last optimized kernel. '''
+        X = np.atleast_2d(X)
+        kernel = self.kernel if self.kernel_ is None else self.kernel_
+        regressor = GaussianProcessRegressor(kernel=kernel,
+                                             alpha=self.alpha,
+                                             n_restarts_optimizer=self.restarts)
+        regressor.fit(X, y)
+        self.kernel_ = regressor.kernel_
+        self.length = len(y)
+        self._X = np.empty((max(self.length, 1), X.shape[1]))
+        self._y = np.empty(max(self.length, 1))
+        self._L = np.zeros((max(self.length, 1), max(self.length, 1)))
+        self.X_train_[:] = X
+        self.y_train_[:] = y
+        self.L_[:] = regressor.L_
+        self.alpha_ = regressor.alpha_.copy()
+        self.refit_length = self.length
+        self.refit_likelihood = self.log_marginal_likelihood()/self.length
+        self.refits += 1
+        return self
+
+    def reserve(self, capacity):
+        ''' Grows the training buffers (by at least a factor of two) to hold the
+            target number of points. '''
+        if capacity <= len(self._y):
+            return
+        capacity = max(capacity, 2*len(self._y))
+        X = np.empty((capacity, self._X.shape[1]))
+        y = np.empty(capacity)
+        L = np.zeros((capacity, capacity))
+        X[:self.length] = self.X_train_
+        y[:self.length] = self.y_train_
+        L[:self.length, :self.length] = self.L_
+        self._X, self._y, self._L = X, y, L
+
+    def update(self, x, y):
+        ''' Appends a single observation with the kernel hyperparameters held
+            fixed, extending the Cholesky factor by one row. '''
+        x = np.atleast_2d(x)
+        k = self.kernel_(self.X_train_, x)[:, 0]
+        l = solve_triangular(self.L_, k, lower=True)
+        d2 = self.kernel_.diag(x)[0] + self.alpha - np.dot(l, l)
+        if d2 <= 0:
+            log.debug('Cholesky update lost positive definiteness; re-optimizing kernel.')
+            return self.optimize(np.append(self.X_train_, x, axis=0), np.append(self.y_train_, y))
+        self.reserve(self.length+1)
+        n = self.length
+        self._X[n] = x[0]
+        self._y[n] = y
+        self._L[n, :n] = l
+        self._L[n, n] = np.sqrt(d2)
+        self.length += 1
+        self.alpha_ = cho_solve((self.L_, True), self.y_train_)
+        return self
+
+    def log_marginal_likelihood(self):
+        ''' Returns the log marginal likelihood of the training data under the
+            current kernel. '''
+        return -0.5*np.dot(self.y_train_, self.alpha_) - np.log(np.diag(self.L_)).sum() - 0.5*self.length*np.log(2*np.pi)
+
+    def predict(self, X, return_std=False):
+        ''' Returns the predicted mean (and optionally standard deviation) at
+            each row of X. '''
+        X = np.atleast_2d(X)
+        K = self.kernel_(X, self.X_train_)
+        mean = K.dot(self.alpha_)
+        if not return_std:
+            return mean
+        v = solve_triangular(self.L_, K.T, lower=True)
+        var = self.kernel_.diag(X) - np.einsum('ij,ij->j', v, v)
+        return mean, np.sqrt(np.clip(var, 0, None))
+
+class SparseGaussianProcess():
+    ''' A sparse Gaussian process using the deterministic training conditional (DTC)
+        approximation: the response surface is represented through m inducing
+        points, so that training on n points costs O(n m^2) and prediction costs
+        O(m^2) per point, independent of the history length. Memory is bounded by
+        retaining at most a fixed window of training points, pruned by importance:
+        the lowest-cost points and the most recent points are kept. '''
+    def __init__(self, kernel, inducing=50, window=1000, restarts=3, alpha=1e-10):
+        ''' Args:
+                kernel (sklearn.gaussian_process.kernels.Kernel): initial kernel; a trailing
+                    WhiteKernel term is treated as the observation noise
+                inducing (int): number of inducing points
+                window (int): maximum number of training points retained
+                restarts (int): optimizer restarts used when fitting the kernel hyperparameters
+                alpha (float): jitter added to the diagonal of the inducing kernel matrix
+        '''
+        self.kernel = kernel
+        self.kernel_ = None
+        self.inducing = inducing
+        self.window = window
+        self.restarts = restarts
+        self.alpha = alpha
+
+    def prune(self, X, y):
+        ''' Returns the indices of the training points to retain: half of the
+            window is allotted to the lowest-cost points and the remainder to the
+            most recent points. '''
+        n = len(y)
+        if n <= self.window:
+            return np.arange(n)
+        recent = np.arange(n - self.window//2, n)
+        older = np.argsort(y[:n-self.window//2])[:self.window - len(recent)]
+        return np.sort(np.append(older, recent))
+
+    def select_inducing(self, X, y):
+        ''' Chooses inducing points from the training data: half are the
+            lowest-cost points, to resolve the region of interest, and half are
+            drawn evenly from the remainder to cover the explored space. '''
+        n = len(y)
+        if n <= self.inducing:
+            return np.arange(n)
+        order = np.argsort(y)
+        best = order[:self.inducing//2]
+        rest = order[self.inducing//2:]
+        spread = rest[np.linspace(0, len(rest)-1, self.inducing-len(best)).astype(int)]
+        return np.append(best, spread)
+
+    def fit(self, X, y):
+        ''' Optimizes the kernel hyperparameters on the inducing subset, then
+            conditions the sparse approximation on the retained window. '''
+        X = np.atleast_2d(X)
+        y = np.asarray(y, dtype=float)
+        keep = self.prune(X, y)
+        X, y = X[keep], y[keep]
+        Z = self.select_inducing(X, y)
+
+        kernel = self.kernel if self.kernel_ is None else self.kernel_
+        regressor = GaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=self.restarts)
+        regressor.fit(X[Z], y[Z])
+        self.kernel_ = regressor.kernel_
+        self.covariance_, self.noise_ = split_noise(self.kernel_)
+
+        self.Z_ = X[Z]
+        Kmm = self.covariance_(self.Z_) + self.alpha*np.eye(len(Z))
+        self.Lm_ = np.linalg.cholesky(Kmm)
+        A = solve_triangular(self.Lm_, self.covariance_(self.Z_, X), lower=True) / np.sqrt(self.noise_)
+        self.LB_ = np.linalg.cholesky(np.eye(len(Z)) + A.dot(A.T))
+        self.c_ = solve_triangular(self.LB_, A.dot(y), lower=True) / np.sqrt(self.noise_)
+        self.n_train_ = len(y)
+        return self
+
+    def predict(self, X, return_std=False):
+        ''' Returns the predicted mean (and optionally standard deviation) at
+            each row of X. '''
+        X = np.atleast_2d(X)
+        a = solve_triangular(self.Lm_, self.covariance_(self.Z_, X), lower=True)
+        b = solve_triangular(self.LB_, a, lower=True)
+        mean = b.T.dot(self.c_)
+        if not return_std:
+            return mean
+        var = self.covariance_.diag(X) - np.einsum('ij,ij->j', a, a) + np.einsum('ij,ij->j', b, b) + self.noise_
+        return mean, np.sqrt(np.clip(var, 0, None))
+
+def split_noise(kernel):
+    ''' Separates a kernel of the form k + WhiteKernel into the noise-free
+        covariance k and the white noise level. '''
+    if isinstance(kernel, Sum) and isinstance(kernel.k2, WhiteKernel):
+        return kernel.k1, kernel.k2.noise_level
+    return kernel, 1e-10
@@ -0,0 +1,154 @@
+''' The RunLog class streams samples to an append-only columnar log on disk as
+    they are acquired, so that a run survives a crash and long series of runs can
+    be loaded quickly for analysis.
+
+    A log is a directory holding:
+        meta.json       column names, user metadata (e.g. knobs and limits) and a
+                        list of events, such as the row indices at which each
+                        block of a Pipeline started and ended
+        00000.npy, ...  completed chunks of rows, each stored column by column
+                        as an array of shape (columns, rows)
+        tail.f8         raw float64 rows appended since the last chunk, written
+                        and flushed one row at a time
+
+    Rows are buffered in a preallocated array; when the buffer fills, it is saved
+    as the next chunk and the tail is truncated, so that appending N rows costs
+    O(N) and a crash loses at most the row being written. The data can be read
+    back with RunLog.read, and many runs at once with read_runs.
+
+    Example:
+        log = RunLog(path, ['time', 'cost', 'A:X'], metadata={'limits': limits})
+        log.append([time.time(), c, x])
+        log.close()
+        df = RunLog.read(path)
+'''
+import json
+import os
+import numpy as np
+
+class RunLog():
+    def __init__(self, path, columns, metadata=None, chunk_size=1024):
+        ''' Args:
+                path (str): directory to create the log in
+                columns (list): names of the logged columns
+                metadata (dict): JSON-serializable information about the run
+                chunk_size (int): number of rows per chunk file
+        '''
+        self.path = path
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.meta = {'columns': self.columns,
+                     'metadata': metadata or {},
+                     'events': []}
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self.chunks = 0
+        self.length = 0
+        self.buffer = np.empty((chunk_size, len(self.columns)))
+        self.buffered = 0
+        self.write_meta()
+        self.tail = open(os.path.join(path, 'tail.f8'), 'wb')
+
+    def __len__(self):
+        return self.length
+
+    def append(self, row):
+        ''' Adds a single row, given as a sequence of floats in column order. '''
+        self.buffer[self.buffered] = row
+        self.tail.write(self.buffer[self.buffered].tobytes())
+        self.tail.flush()
+        self.buffered += 1
+        self.length += 1
+        if self.buffered == self.chunk_size:
+            self.flush()
+
+    def extend(self, rows):
+        ''' Adds a 2D array of rows. '''
+        for row in np.atleast_2d(rows):
+            self.append(row)
+
+    def flush(self):
+        ''' Saves the buffered rows as a new chunk and truncates the tail. '''
+        if self.buffered == 0:
+            return
+        filename = os.path.join(self.path, '%05i.npy'%self.chunks)
+        np.save(filename, np.ascontiguousarray(self.buffer[:self.buffered].T))
+        self.chunks += 1
+        self.buffered = 0
+        self.tail.seek(0)
+        self.tail.truncate()
+
+    def mark(self, event, **kwargs):
+        ''' Records an event at the current row index, e.g. the start of a
+            block, in the metadata. '''
+        self.meta['events'].append(dict(kwargs, event=event, index=self.length))
+        self.write_meta()
+
+    def update(self, **metadata):
+        ''' Adds or replaces entries in the run metadata. '''
+        self.meta['metadata'].update(metadata)
+        self.write_meta()
+
+    def write_meta(self):
+        filename = os.path.join(self.path, 'meta.json')
+        with open(filename+'.tmp', 'w') as file:
+            json.dump(self.meta, file, indent=2, default=str)
+        os.replace(filename+'.tmp', filename)
+
+    def close(self):
+        ''' Saves any buffered rows and closes the tail. '''
+        if self.tail.closed:
+            return
+        self.flush()
+        self.tail.close()
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, d):
+        self.path = d['path']
+
+    @staticmethod
+    def metadata(path):
+        ''' Returns the metadata and events of a logged run. '''
+        with open(os.path.join(path, 'meta.json'), 'r') as file:
+            return json.load(file)
+
+    @staticmethod
+    def load(path):
+        ''' Returns the columns of a logged run as a dict of arrays, including
+            any rows in the tail of a run that did not finish cleanly. '''
+        meta = RunLog.metadata(path)
+        n = len(meta['columns'])
+        arrays = []
+        i = 0
+        while os.path.exists(os.path.join(path, '%05i.npy'%i)):
+            arrays.append(np.load(os.path.join(path, '%05i.npy'%i)))
+            i += 1
+        tail = os.path.join(path, 'tail.f8')
+        if os.path.exists(tail):
+            rows = np.fromfile(tail, dtype=float)
+            rows = rows[:len(rows)//n*n]
+            arrays.append(rows.reshape(-1, n).T)
+        data = np.concatenate(arrays, axis=1) if arrays else np.empty((n, 0))
+        return dict(zip(meta['columns'], data))
+
+    @staticmethod
+    def read(path, index='time'):
+        ''' Returns a logged run as a DataFrame, indexed by the passed column. '''
+        import pandas as pd
+        df = pd.DataFrame(RunLog.load(path))
+        if index in df.columns:
+            df = df.set_index(index)
+        return df
+
+def read_runs(paths, index='time'):
+    ''' Loads several logged runs into one DataFrame with a 'run' column
+        holding the name of each run's directory. '''
+    import pandas as pd
+    frames = []
+    for path in paths:
+        df = RunLog.read(path, index=index)
+        df['run'] = os.path.basename(os.path.normpath(path))
+        frames.append(df)
+    return pd.concat(frames, sort=False)